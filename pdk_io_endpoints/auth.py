@@ -1,13 +1,22 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import orjson
 import urllib.parse
 import time
-import uuid
+import random
+import secrets
 import sqlite3
 import os
+import re
+import atexit
+import functools
+import threading
 import logging
-from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
 from typing import Dict, Any, Optional
 
 # Configure logging
@@ -20,9 +29,57 @@ logger = logging.getLogger('PDKAuth')
 # Get the repo root directory (parent of pdk_io_endpoints)
 REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Matches the 24-hex-char clientId embedded in the login page scripts
+CLIENT_ID_RE = re.compile(rb'clientId["\']?\s*[:=]\s*["\']([a-f0-9]{24})["\']')
+
+# One retry policy for every adapter this module mounts; built once at
+# import instead of per session
+RETRY_POLICY = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=[502, 503, 504],
+    allowed_methods=frozenset(["GET", "POST"])
+)
+
+# Header variants are identical for every PDKAuth instance, so build them
+# once at import time as read-only mappings instead of per-instance copies
+BASE_HEADERS = MappingProxyType({
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36",
+    "Content-Type": "application/json;charset=UTF-8",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en",
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache",
+    "sec-ch-ua": "\"Not(A:Brand\";v=\"99\", \"Google Chrome\";v=\"133\", \"Chromium\";v=\"133\"",
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": "\"macOS\""
+})
+
+LOGIN_HEADERS = MappingProxyType(dict(BASE_HEADERS, **{
+    "Origin": "https://accounts.pdk.io",
+    "Referer": "https://accounts.pdk.io/login"
+}))
+
+OAUTH_HEADERS = MappingProxyType(dict(BASE_HEADERS, **{
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Referer": "https://accounts.pdk.io/login",
+    "Upgrade-Insecure-Requests": "1"
+}))
+
+INTERACTION_HEADERS = MappingProxyType(dict(BASE_HEADERS, **{
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://accounts.pdk.io/login",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "same-origin",
+    "Sec-Fetch-User": "?1",
+    "Upgrade-Insecure-Requests": "1"
+}))
+
 # Load credentials from credentials.json
-with open(os.path.join(REPO_ROOT, 'credentials.json')) as f:
-    credentials = json.load(f)
+with open(os.path.join(REPO_ROOT, 'credentials.json'), 'rb') as f:
+    credentials = orjson.loads(f.read())
 
 # User configuration
 USER_CONFIG = {
@@ -32,36 +89,132 @@ USER_CONFIG = {
     "client_id": "544557759a01deb9874c02ee", #this seems to be the same for all users and systems using this auth flow. We should probably check if this is the case for all users and systems.
 }
 
+@functools.lru_cache(maxsize=256)
+def _build_url(base_url, system_id, endpoint):
+    """Memoize endpoint URL construction; keyed on immutable strings"""
+    return f"{base_url}/{system_id}/{endpoint.lstrip('/')}"
+
+
+# Named view over a tokens row so callers don't index by position
+TokenRow = namedtuple('TokenRow', [
+    'system_id', 'auth_token', 'access_token', 'system_token',
+    'auth_nonce', 'auth_token_expiry', 'system_token_expiry'
+])
+
 class TokenManager:
+    # Hoisted SQL so sqlite3's per-connection statement cache (keyed by the
+    # SQL string) reuses the compiled plan instead of re-parsing per call
+    # Native UPSERT updates the existing leaf entry in place, where
+    # INSERT OR REPLACE deletes the row and inserts a new one
+    _SQL_STORE = '''
+        INSERT INTO tokens
+        (system_id, auth_token, access_token, system_token, auth_nonce,
+         auth_token_expiry, system_token_expiry, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(system_id) DO UPDATE SET
+            auth_token = excluded.auth_token,
+            access_token = excluded.access_token,
+            system_token = excluded.system_token,
+            auth_nonce = excluded.auth_nonce,
+            auth_token_expiry = excluded.auth_token_expiry,
+            system_token_expiry = excluded.system_token_expiry,
+            last_updated = excluded.last_updated
+    '''
+    _SQL_UPDATE_SYSTEM_TOKEN = '''
+        UPDATE tokens
+        SET system_token = ?, system_token_expiry = ?, last_updated = ?
+        WHERE system_id = ?
+    '''
+    _SQL_GET_ROW = '''
+        SELECT system_id, auth_token, access_token, system_token, auth_nonce,
+               auth_token_expiry, system_token_expiry
+        FROM tokens
+        WHERE system_id = ?
+    '''
+
+    # Paths whose schema has already been verified this process, so
+    # repeated TokenManager construction skips the sqlite_master lookup
+    _schema_checked = set()
+    _schema_lock = threading.Lock()
+
     def __init__(self, db_path=None):
         if db_path is None:
             db_path = os.path.join(REPO_ROOT, 'token.db')
         self.db_path = db_path
         self.logger = logging.getLogger('PDKAuth.TokenManager')
+        # One long-lived connection per thread instead of connect/close per call
+        self._local = threading.local()
         self._ensure_db_exists()
-
-    def _ensure_db_exists(self):
-        """Check if database exists and initialize if it doesn't"""
-        db_exists = os.path.exists(self.db_path)
-        conn = None
+        atexit.register(self.close)
+
+    def _conn(self):
+        """Get (or lazily create) the long-lived connection for this thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit (isolation_level=None) so single-statement writes
+            # don't pay an implicit BEGIN/COMMIT pair
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   isolation_level=None)
+            self._apply_pragmas(conn)
+            self._local.conn = conn
+            self._local.cursor = conn.cursor()
+        return conn
+
+    def _cursor(self):
+        """Get the reusable cursor for this thread's connection"""
+        self._conn()
+        return self._local.cursor
+
+    def _apply_pragmas(self, conn):
+        """Apply performance PRAGMAs to a new connection"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            if not db_exists:
-                self.logger.info(f"Creating new database at {self.db_path}")
-                self.init_db(conn)
-            else:
-                # Verify the table structure
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='tokens'")
-                if not cursor.fetchone():
-                    self.logger.info("Database exists but tokens table missing. Creating table.")
-                    self.init_db(conn)
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA cache_size=-2000")
+            cursor.execute("PRAGMA mmap_size=16777216")
         except sqlite3.Error as e:
-            self.logger.error(f"Database initialization error: {str(e)}")
-            raise
-        finally:
-            if conn:
+            self.logger.error("Failed to apply database pragmas: %s", e)
+
+    def close(self):
+        """Close this thread's long-lived connection if one was opened"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
                 conn.close()
+            except sqlite3.Error as e:
+                self.logger.error("Failed to close database connection: %s", e)
+            self._local.conn = None
+
+    def _ensure_db_exists(self):
+        """Check if database exists and initialize if it doesn't (once per process)"""
+        with TokenManager._schema_lock:
+            if self.db_path in TokenManager._schema_checked:
+                return
+            db_exists = os.path.exists(self.db_path)
+            conn = None
+            try:
+                conn = sqlite3.connect(self.db_path)
+                self._apply_pragmas(conn)
+                if not db_exists:
+                    self.logger.info("Creating new database at %s", self.db_path)
+                    self.init_db(conn)
+                else:
+                    # Verify the table structure
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='tokens'")
+                    if not cursor.fetchone():
+                        self.logger.info("Database exists but tokens table missing. Creating table.")
+                        self.init_db(conn)
+                TokenManager._schema_checked.add(self.db_path)
+            except sqlite3.Error as e:
+                self.logger.error("Database initialization error: %s", e)
+                raise
+            finally:
+                if conn:
+                    conn.close()
 
     def init_db(self, conn):
         """Initialize the SQLite database with necessary tables"""
@@ -82,92 +235,107 @@ class TokenManager:
             conn.commit()
             self.logger.info("Database initialized successfully")
         except sqlite3.Error as e:
-            self.logger.error(f"Failed to initialize database: {str(e)}")
+            self.logger.error("Failed to initialize database: %s", e)
             raise
 
+    @staticmethod
+    def _as_epoch(value):
+        """Coerce a stored expiry to epoch seconds (0 if unreadable)"""
+        if isinstance(value, (int, float)):
+            return float(value)
+        try:
+            # Legacy rows stored datetime strings; treat unparseable as expired
+            return datetime.fromisoformat(str(value)).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+
     def store_tokens(self, auth_data):
         """Store token information in the database"""
-        conn = None
-        try:
-            now = datetime.utcnow()
-            auth_token_expiry = now + timedelta(minutes=5)
-            system_token_expiry = now + timedelta(minutes=5)
+        self.store_tokens_bulk([auth_data])
 
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO tokens 
-                (system_id, auth_token, access_token, system_token, auth_nonce,
-                 auth_token_expiry, system_token_expiry, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                auth_data['current_system_id'],
-                auth_data['auth_token'],
-                auth_data['access_token'],
-                auth_data['system_token'],
-                auth_data['auth_nonce'],
-                auth_token_expiry,
-                system_token_expiry,
-                now
-            ))
-            conn.commit()
-            self.logger.info(f"Stored tokens for system {auth_data['current_system_id']}")
+    def store_tokens_bulk(self, auth_data_list):
+        """Store several token records in one transaction (single WAL commit)"""
+        if not auth_data_list:
+            return
+        try:
+            # Expiries are stored as epoch seconds so reads bind/compare plain ints
+            now = int(time.time())
+            expiry = now + 300
+            rows = [
+                (
+                    auth_data['current_system_id'],
+                    auth_data['auth_token'],
+                    auth_data['access_token'],
+                    auth_data['system_token'],
+                    auth_data['auth_nonce'],
+                    expiry,
+                    expiry,
+                    now
+                )
+                for auth_data in auth_data_list
+            ]
+            cursor = self._cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.executemany(self._SQL_STORE, rows)
+                cursor.execute("COMMIT")
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK")
+                raise
+            self.logger.info("Stored tokens for %d system(s)", len(rows))
         except sqlite3.Error as e:
-            self.logger.error(f"Failed to store tokens: {str(e)}")
+            self.logger.error("Failed to store tokens: %s", e)
             raise
-        finally:
-            if conn:
-                conn.close()
 
-    def get_valid_tokens(self, system_id):
-        """Retrieve valid tokens for a given system_id"""
-        conn = None
+    def update_system_token(self, system_id, system_token, expiry=None):
+        """Update only the system token columns for an existing row.
+
+        Returns False when no row exists yet (caller should fall back to
+        store_tokens). Avoids rewriting the long auth_token JWT on the
+        common refresh path.
+        """
         try:
-            now = datetime.utcnow()
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM tokens 
-                WHERE system_id = ? 
-                AND system_token_expiry > ?
-            ''', (system_id, now))
-            result = cursor.fetchone()
-            if result:
-                self.logger.info(f"Retrieved valid tokens for system {system_id}")
-            else:
-                self.logger.info(f"No valid tokens found for system {system_id}")
-            return result
+            now = int(time.time())
+            if expiry is None:
+                expiry = now + 300
+            cursor = self._cursor()
+            cursor.execute(self._SQL_UPDATE_SYSTEM_TOKEN, (system_token, expiry, now, system_id))
+            if cursor.rowcount:
+                self.logger.info("Updated system token for system %s", system_id)
+                return True
+            return False
         except sqlite3.Error as e:
-            self.logger.error(f"Failed to retrieve tokens: {str(e)}")
+            self.logger.error("Failed to update system token: %s", e)
             raise
-        finally:
-            if conn:
-                conn.close()
 
-    def get_valid_auth_token(self, system_id):
-        """Retrieve a valid auth token for a given system_id"""
-        conn = None
+    def get_token_row(self, system_id):
+        """Fetch the stored token row for a system_id (validity decided by callers)"""
         try:
-            now = datetime.utcnow()
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT auth_token FROM tokens 
-                WHERE system_id = ? 
-                AND auth_token_expiry > ?
-            ''', (system_id, now))
-            result = cursor.fetchone()
-            if result:
-                self.logger.info(f"Retrieved valid auth token for system {system_id}")
-            else:
-                self.logger.info(f"No valid auth token found for system {system_id}")
-            return result[0] if result else None
+            cursor = self._cursor()
+            cursor.execute(self._SQL_GET_ROW, (system_id,))
+            row = cursor.fetchone()
+            return TokenRow(*row) if row else None
         except sqlite3.Error as e:
-            self.logger.error(f"Failed to retrieve auth token: {str(e)}")
+            self.logger.error("Failed to retrieve tokens: %s", e)
             raise
-        finally:
-            if conn:
-                conn.close()
+
+    def get_valid_tokens(self, system_id):
+        """Retrieve valid tokens for a given system_id"""
+        row = self.get_token_row(system_id)
+        if row and self._as_epoch(row.system_token_expiry) > time.time():
+            self.logger.info("Retrieved valid tokens for system %s", system_id)
+            return row
+        self.logger.info("No valid tokens found for system %s", system_id)
+        return None
+
+    def get_valid_auth_token(self, system_id):
+        """Retrieve a valid auth token for a given system_id"""
+        row = self.get_token_row(system_id)
+        if row and row.auth_token and self._as_epoch(row.auth_token_expiry) > time.time():
+            self.logger.info("Retrieved valid auth token for system %s", system_id)
+            return row.auth_token
+        self.logger.info("No valid auth token found for system %s", system_id)
+        return None
 
 class PDKAuth:
     def __init__(self):
@@ -177,7 +345,26 @@ class PDKAuth:
         self.client_id = USER_CONFIG["client_id"]
         self.system_id = USER_CONFIG["system_id"]
         self.redirect_uri = "https://pdk.io/authCallback"
-        
+
+        # URLs are constant for the life of the process; build them once
+        # instead of re-interpolating f-strings per call
+        self.local_auth_url = f"{self.base_url}/auth/local"
+        self.profile_url = f"{self.base_url}/profile"
+        self.oauth_url = f"{self.base_url}/oauth2/auth"
+        self.login_page_url = f"{self.base_url}/login"
+        self.system_token_url = f"{self.base_url}/api/systems/{self.system_id}/token"
+
+        # In-process cache of the last validated auth_data so back-to-back
+        # API calls don't hit SQLite at all
+        self._cached_auth_data = None
+        self._cached_deadline = 0.0
+        # The session (and therefore this auth instance) may be shared
+        # across threads, so guard the cache fields
+        self._cache_lock = threading.Lock()
+        # Serializes the slow refresh/login path so N threads that see a
+        # stale token trigger one network exchange, not N
+        self._refresh_lock = threading.Lock()
+
         try:
             self.token_manager = TokenManager()
             self._initialize_session()
@@ -188,43 +375,39 @@ class PDKAuth:
     def _initialize_session(self):
         """Initialize session and headers"""
         self.session = requests.Session()
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36",
-            "Content-Type": "application/json;charset=UTF-8", 
-            "Accept": "application/json, text/plain, */*",
-            "Accept-Language": "en",
-            "Cache-Control": "no-cache",
-            "Pragma": "no-cache",
-            "sec-ch-ua": "\"Not(A:Brand\";v=\"99\", \"Google Chrome\";v=\"133\", \"Chromium\";v=\"133\"",
-            "sec-ch-ua-mobile": "?0",
-            "sec-ch-ua-platform": "\"macOS\""
-        }
-
-        # Common header variations
-        self.login_headers = self.headers.copy()
-        self.login_headers.update({
-            "Origin": "https://accounts.pdk.io",
-            "Referer": "https://accounts.pdk.io/login"
-        })
-
-        self.oauth_headers = self.headers.copy()
-        self.oauth_headers.update({
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Referer": "https://accounts.pdk.io/login",
-            "Upgrade-Insecure-Requests": "1"
-        })
-
-        self.interaction_headers = self.headers.copy()
-        self.interaction_headers.update({
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Referer": "https://accounts.pdk.io/login",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate", 
-            "Sec-Fetch-Site": "same-origin",
-            "Sec-Fetch-User": "?1",
-            "Upgrade-Insecure-Requests": "1"
-        })
+        # Larger pool than the requests default plus transient-error retries,
+        # so bursty parallel use doesn't discard warm connections
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=64,
+            max_retries=RETRY_POLICY
+        )
+        self.session.mount("https://", adapter)
+        # References to the shared frozen constants; copy only when a
+        # request needs per-call mutation
+        self.headers = BASE_HEADERS
+        self.login_headers = LOGIN_HEADERS
+        self.oauth_headers = OAUTH_HEADERS
+        self.interaction_headers = INTERACTION_HEADERS
+        # Base headers ride on the session itself; per-call dicts only
+        # need to carry their overrides
+        self.session.headers.update(BASE_HEADERS)
+
+    def _cache_auth_data(self, auth_data, system_token_expiry=None):
+        """Cache validated auth data in memory until shortly before expiry"""
+        ttl = 300.0
+        if system_token_expiry is not None:
+            ttl = TokenManager._as_epoch(system_token_expiry) - time.time()
+        with self._cache_lock:
+            self._cached_auth_data = auth_data
+            # Drop the cache a few seconds early so we never serve a stale token
+            self._cached_deadline = time.monotonic() + max(ttl - 5.0, 0.0)
+
+    def invalidate_cached_tokens(self):
+        """Drop the in-process token cache (e.g. after a 401 response)"""
+        with self._cache_lock:
+            self._cached_auth_data = None
+            self._cached_deadline = 0.0
 
     def refresh_system_token(self, auth_token):
         """Attempt to get a new system token using an existing auth token"""
@@ -236,9 +419,8 @@ class PDKAuth:
             "Content-Type": "application/json;charset=UTF-8"
         }
         
-        system_token_url = f"{self.base_url}/api/systems/{self.system_id}/token"
         system_token_response = self.session.post(
-            system_token_url, 
+            self.system_token_url,
             headers=api_headers
         )
         
@@ -260,11 +442,11 @@ class PDKAuth:
                 self.logger.info("Initial authentication successful")
                 return auth_data
             return {
-                "current_system_id": tokens[0],
-                "auth_token": tokens[1],
-                "access_token": tokens[2],
-                "system_token": tokens[3],
-                "auth_nonce": tokens[4]
+                "current_system_id": tokens.system_id,
+                "auth_token": tokens.auth_token,
+                "access_token": tokens.access_token,
+                "system_token": tokens.system_token,
+                "auth_nonce": tokens.auth_nonce
             }
         except Exception as e:
             self.logger.error(f"Initialization failed: {str(e)}")
@@ -273,43 +455,67 @@ class PDKAuth:
     def get_valid_tokens(self):
         """Get valid tokens or refresh/authenticate as needed"""
         try:
-            # Check for valid tokens in database
-            tokens = self.token_manager.get_valid_tokens(self.system_id)
-            
-            if tokens:
-                self.logger.info("Using existing valid tokens")
-                return {
-                    "current_system_id": tokens[0],
-                    "auth_token": tokens[1],
-                    "access_token": tokens[2],
-                    "system_token": tokens[3],
-                    "auth_nonce": tokens[4]
-                }
-
-            # Check if we have a valid auth token to try refreshing system token
-            auth_token = self.token_manager.get_valid_auth_token(self.system_id)
-            if auth_token:
-                self.logger.info("Attempting to refresh system token with valid auth token")
-                system_token = self.refresh_system_token(auth_token)
-                if system_token:
-                    self.logger.info("Successfully refreshed system token")
-                    auth_data = {
-                        "current_system_id": self.system_id,
-                        "auth_token": auth_token,
-                        "access_token": None,
-                        "system_token": system_token,
-                        "auth_nonce": None
-                    }
-                    self.token_manager.store_tokens(auth_data)
-                    return auth_data
-
-            # If we get here, we need to perform a full authentication
-            self.logger.info("Performing full authentication")
-            return self.login()
+            # Serve from memory while the cached system token is still fresh
+            with self._cache_lock:
+                if self._cached_auth_data and time.monotonic() < self._cached_deadline:
+                    return self._cached_auth_data
+
+            with self._refresh_lock:
+                # Double-checked: another thread may have refreshed while
+                # we waited on the lock
+                with self._cache_lock:
+                    if self._cached_auth_data and time.monotonic() < self._cached_deadline:
+                        return self._cached_auth_data
+                return self._get_valid_tokens_locked()
         except Exception as e:
             self.logger.error(f"Error getting valid tokens: {str(e)}")
             raise
 
+    def _get_valid_tokens_locked(self):
+        """Slow path of get_valid_tokens; caller holds _refresh_lock"""
+        # One row fetch decides both branches instead of separate
+        # accessor round-trips per expiry column
+        row = self.token_manager.get_token_row(self.system_id)
+        now = time.time()
+
+        if row and TokenManager._as_epoch(row.system_token_expiry) > now:
+            self.logger.info("Using existing valid tokens")
+            auth_data = {
+                "current_system_id": row.system_id,
+                "auth_token": row.auth_token,
+                "access_token": row.access_token,
+                "system_token": row.system_token,
+                "auth_nonce": row.auth_nonce
+            }
+            self._cache_auth_data(auth_data, row.system_token_expiry)
+            return auth_data
+
+        # Check if we have a valid auth token to try refreshing system token
+        auth_token = None
+        if row and row.auth_token and TokenManager._as_epoch(row.auth_token_expiry) > now:
+            auth_token = row.auth_token
+        if auth_token:
+            self.logger.info("Attempting to refresh system token with valid auth token")
+            system_token = self.refresh_system_token(auth_token)
+            if system_token:
+                self.logger.info("Successfully refreshed system token")
+                auth_data = {
+                    "current_system_id": self.system_id,
+                    "auth_token": auth_token,
+                    "access_token": None,
+                    "system_token": system_token,
+                    "auth_nonce": None
+                }
+                # Only the system token changed; avoid rewriting the full row
+                if not self.token_manager.update_system_token(self.system_id, system_token):
+                    self.token_manager.store_tokens(auth_data)
+                self._cache_auth_data(auth_data)
+                return auth_data
+
+        # If we get here, we need to perform a full authentication
+        self.logger.info("Performing full authentication")
+        return self.login()
+
     def login(self, email=USER_CONFIG["email"], password=USER_CONFIG["password"]):
         """Perform full authentication flow and store tokens"""
         auth_data = self._perform_login(email, password)
@@ -317,34 +523,44 @@ class PDKAuth:
         # Store the tokens
         if auth_data:
             self.token_manager.store_tokens(auth_data)
-        
+            self._cache_auth_data(auth_data)
+
         return auth_data
 
     def _perform_login(self, email=USER_CONFIG["email"], password=USER_CONFIG["password"]):
         """Internal method to perform the actual login flow"""
         # Step 1: Initial login
-        print("\n=== Performing Login ===")
-        login_url = f"{self.base_url}/auth/local"
+        self.logger.debug("Performing login")
         login_payload = {"email": email, "password": password}
         
-        login_response = self.session.post(login_url, json=login_payload, headers=self.login_headers)
-        print(f"Login Status: {login_response.status_code}")
-        
-        if login_response.status_code == 429:
-            print(f"Rate limit exceeded: {login_response.text}")
-            exit()
-        elif login_response.status_code != 200:
+        for attempt in range(3):
+            # Pre-serialized bytes skip requests' internal json.dumps;
+            # login_headers already carries the JSON content type
+            login_response = self.session.post(self.local_auth_url, data=orjson.dumps(login_payload), headers=self.login_headers)
+            self.logger.debug("Login status: %s", login_response.status_code)
+            if login_response.status_code != 429:
+                break
+            # Rate limited: honor Retry-After when present, otherwise back
+            # off exponentially with jitter, reusing the warm session
+            retry_after = login_response.headers.get("Retry-After")
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = min(60, 2 ** attempt + random.uniform(0, 1))
+            self.logger.warning("Rate limit exceeded, retrying login in %.1fs", delay)
+            time.sleep(delay)
+
+        if login_response.status_code != 200:
             raise Exception("Login failed")
 
         # Step 2: Get profile
-        print("\n=== Getting Profile ===")
-        profile_url = f"{self.base_url}/profile"
-        profile_response = self.session.get(profile_url, headers=self.login_headers)
-        print(f"Profile Status: {profile_response.status_code}")
+        self.logger.debug("Getting profile")
+        profile_response = self.session.get(self.profile_url, headers=self.login_headers)
+        self.logger.debug("Profile status: %s", profile_response.status_code)
 
         # Step 3: Get interaction ID
-        print("\n=== Getting Interaction ID ===")
-        nonce = ''.join(str(uuid.uuid4()).split('-'))[:32]
+        self.logger.debug("Getting interaction ID")
+        nonce = secrets.token_hex(16)
         oauth_params = {
             "response_type": "id_token token",
             "client_id": self.client_id,
@@ -353,17 +569,15 @@ class PDKAuth:
             "scope": "openid"
         }
         
-        oauth_url = f"{self.base_url}/oauth2/auth"
-        oauth_response = self.session.get(oauth_url, params=oauth_params, headers=self.oauth_headers, allow_redirects=False)
-        print(f"OAuth Status: {oauth_response.status_code}")
+        oauth_response = self.session.get(self.oauth_url, params=oauth_params, headers=self.oauth_headers, allow_redirects=False)
+        self.logger.debug("OAuth status: %s", oauth_response.status_code)
         
         if oauth_response.status_code == 302:
             location = oauth_response.headers.get('Location', '')
             interaction_id = location.split('/')[-1]
-            print(f"Interaction ID: {interaction_id}")
+            self.logger.debug("Interaction ID: %s", interaction_id)
             
             # Step 4a: First interaction call
-            print("\n=== First Interaction Call ===")
             first_interaction_url = f"{self.base_url}/interaction/{interaction_id}"
             
             first_interaction_response = self.session.get(
@@ -371,11 +585,10 @@ class PDKAuth:
                 headers=self.interaction_headers,
                 allow_redirects=False
             )
-            print(f"First Interaction Status: {first_interaction_response.status_code}")
+            self.logger.debug("First interaction status: %s", first_interaction_response.status_code)
             
             if first_interaction_response.status_code == 302:
                 # Step 4b: Second interaction call
-                print("\n=== Second Interaction Call ===")
                 second_interaction_url = f"{self.base_url}/oauth2/auth/{interaction_id}"
                 
                 second_interaction_response = self.session.get(
@@ -383,27 +596,26 @@ class PDKAuth:
                     headers=self.interaction_headers,
                     allow_redirects=False
                 )
-                print(f"Second Interaction Status: {second_interaction_response.status_code}")
+                self.logger.debug("Second interaction status: %s", second_interaction_response.status_code)
                 
                 if second_interaction_response.status_code == 302:
                     callback_url = second_interaction_response.headers.get('Location', '')
-                    print(f"Callback URL: {callback_url}")
+                    self.logger.debug("Callback URL received")
                     
                     if '#' in callback_url:
-                        fragment = callback_url.split('#')[1]
-                        params = dict(param.split('=') for param in urllib.parse.unquote(fragment).split('&'))
+                        fragment = callback_url.partition('#')[2]
+                        params = dict(urllib.parse.parse_qsl(fragment, keep_blank_values=True))
                         
                         auth_token = params.get('id_token')
                         access_token = params.get('access_token')
                         
-                        print(f"\nAuth Token Found: {'Yes' if auth_token else 'No'}")
-                        print(f"Access Token Found: {'Yes' if access_token else 'No'}")
+                        self.logger.debug("Auth token found: %s", auth_token is not None)
+                        self.logger.debug("Access token found: %s", access_token is not None)
                         
                         # Step 5: Get system token using auth_token
                         if auth_token:
-                            print("\n=== Getting System Token ===")
                             system_token = self.refresh_system_token(auth_token)
-                            print(f"System Token Status: {system_token is not None}")
+                            self.logger.debug("System token obtained: %s", system_token is not None)
                             
                             if system_token:
                                 auth_data = {
@@ -418,9 +630,13 @@ class PDKAuth:
         raise Exception("Failed to complete authentication flow")
 
     def get_client_id(self):
-        """Retrieve client_id from the login page"""
-        print("\n=== Getting Client ID ===")
-        login_url = f"{self.base_url}/login"
+        """Retrieve client_id, hitting the login page only when it's unknown"""
+        # The configured value covers every system seen so far; skip the
+        # network fetch and page scan entirely when it's present
+        if USER_CONFIG.get("client_id"):
+            self.client_id = USER_CONFIG["client_id"]
+            return True
+
         headers = self.headers.copy()
         headers.update({
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
@@ -429,37 +645,54 @@ class PDKAuth:
             "Upgrade-Insecure-Requests": "1"
         })
         
-        response = self.session.get(login_url, headers=headers)
-        print(f"Login page status: {response.status_code}")
-        
-        if response.status_code == 200:
-            # Print the first 1000 characters of the response to see what we're getting
-            print("Response preview:")
-            print(response.text[:1000])
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            scripts = soup.find_all('script')
-            print(f"\nFound {len(scripts)} script tags")
-            
-            for i, script in enumerate(scripts):
-                print(f"\nScript {i + 1}:")
-                if script.string:
-                    print(script.string[:200])  # Print first 200 chars of each script
-                    if 'clientId' in script.string:
-                        print("Found clientId in this script!")
-                        print(script.string)
-        
-        # For now, return the hardcoded value to keep things working
+        # Stream the page and stop reading as soon as the clientId shows up,
+        # instead of slurping the whole document into memory
+        response = self.session.get(self.login_page_url, headers=headers, stream=True)
+        try:
+            self.logger.debug("Login page status: %s", response.status_code)
+
+            if response.status_code == 200:
+                # Keep a short tail from the previous chunk so a match
+                # spanning a chunk boundary isn't missed
+                tail = b""
+                for chunk in response.iter_content(8192):
+                    match = CLIENT_ID_RE.search(tail + chunk)
+                    if match:
+                        self.client_id = match.group(1).decode()
+                        self.logger.debug("Found clientId: %s", self.client_id)
+                        return True
+                    tail = chunk[-64:]
+        finally:
+            response.close()
+
+        # Fall back to the hardcoded value to keep things working
         self.client_id = USER_CONFIG["client_id"]
         return True
 
 class BaseAPI:
     """Base class for PDK API endpoints with token management"""
-    def __init__(self, base_url: str = "https://systems.pdk.io"):
+
+    # Shared across all endpoint classes so they use one token cache and
+    # one keep-alive connection pool instead of re-authenticating each
+    _shared_auth: Optional[PDKAuth] = None
+
+    def __init__(self, base_url: str = "https://systems.pdk.io",
+                 auth: Optional[PDKAuth] = None):
         self.logger = logging.getLogger('PDKAuth.BaseAPI')
         self.base_url = base_url
-        self.auth = PDKAuth()
+        if auth is not None:
+            self.auth = auth
+        else:
+            if BaseAPI._shared_auth is None:
+                BaseAPI._shared_auth = PDKAuth()
+            self.auth = BaseAPI._shared_auth
+        # Reuse the auth session's keep-alive connection pool for API calls
+        self.session = self.auth.session
         self._ensure_authenticated()
+        # Static header parts built once; the Authorization value is
+        # re-derived only when the token actually changes
+        self._base_headers = {"Accept": "application/json"}
+        self._auth_header = f"Bearer {self.auth_data['system_token']}"
 
     def _ensure_authenticated(self):
         """Ensure we have valid authentication tokens"""
@@ -470,6 +703,7 @@ class BaseAPI:
     def _refresh_if_needed(self):
         """Check and refresh tokens if necessary before making a request"""
         self.auth_data = self.auth.get_valid_tokens()
+        self._auth_header = f"Bearer {self.auth_data['system_token']}"
 
     def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None, 
                      data: Optional[Dict] = None, headers: Optional[Dict] = None) -> Dict[str, Any]:
@@ -485,37 +719,55 @@ class BaseAPI:
         Returns:
             Dict[str, Any]: JSON response from the API
         """
-        # Ensure we have valid tokens
-        self._refresh_if_needed()
-        
+        # Send optimistically with the token we already hold; the 401
+        # branch below refreshes and retries if it went stale
         # Build URL
-        url = f"{self.base_url}/{self.auth.system_id}/{endpoint.lstrip('/')}"
+        url = _build_url(self.base_url, self.auth.system_id, endpoint)
         
-        # Prepare headers
-        request_headers = {
-            "Authorization": f"Bearer {self.auth_data['system_token']}",
-            "Accept": "application/json"
-        }
+        # Prepare headers from the cached parts
+        request_headers = {"Authorization": self._auth_header, **self._base_headers}
         if headers:
             request_headers.update(headers)
-            
+
+        # Pre-serialize the body once with orjson, bypassing requests'
+        # internal json.dumps on both the first attempt and the retry
+        body = orjson.dumps(data) if data else None
+        if body is not None:
+            request_headers.setdefault("Content-Type", "application/json")
+
         try:
-            # Make the request
-            response = requests.request(
+            # Make the request on the pooled session (keep-alive, no new TLS handshake)
+            response = self.session.request(
                 method=method,
                 url=url,
                 params=params,
-                json=data if data else None,
+                data=body,
                 headers=request_headers
             )
+            if response.status_code == 401:
+                # Cached token went stale server-side: drop it, re-auth and retry once
+                self.auth.invalidate_cached_tokens()
+                self._refresh_if_needed()
+                request_headers["Authorization"] = self._auth_header
+                response = self.session.request(
+                    method=method,
+                    url=url,
+                    params=params,
+                    data=body,
+                    headers=request_headers
+                )
             response.raise_for_status()
             
-            # Log response headers for debugging
-            self.logger.debug("Response Headers:")
-            for header, value in response.headers.items():
-                self.logger.debug(f"{header}: {value}")
-            
-            return response.json()
+            # Log response headers for debugging; skip the whole loop
+            # unless a debug handler will actually emit it
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Response Headers:")
+                for header, value in response.headers.items():
+                    self.logger.debug("%s: %s", header, value)
+
+            # orjson parses large list payloads several times faster than
+            # the pure-Python scanner behind response.json()
+            return orjson.loads(response.content)
             
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Error making {method} request to {endpoint}: {str(e)}")
@@ -1,16 +1,12 @@
 import json
 import logging
-from typing import Dict, Any, Optional, List
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+from ..auth import _build_url
 from ..system_functions.list_cloud_nodes import PDKEndpoint, BaseAPI
 from ..system_functions.list_devices import PDKDeviceEndpoint
 from .control_device import GateActivityManager
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger('PDKDeviceClose')
 
 class PDKDeviceCloseEndpoint(BaseAPI):
@@ -19,7 +15,8 @@ class PDKDeviceCloseEndpoint(BaseAPI):
     def __init__(self, base_url: str = "https://systems.pdk.io"):
         # Properly initialize the base class first
         super().__init__(base_url)
-        self.activity_manager = GateActivityManager()
+        self.activity_manager = GateActivityManager.get()
+        self._post_headers = {**self._base_headers, "Content-Type": "application/json"}
     
     def close_device(self, cloud_node_id: str, device_id: str) -> bool:
         """Attempt to close a device.
@@ -36,26 +33,27 @@ class PDKDeviceCloseEndpoint(BaseAPI):
         
         # Build endpoint URL
         endpoint = f"cloud-nodes/{cloud_node_id}/devices/{device_id}/close"
-        url = f"{self.base_url}/{self.auth.system_id}/{endpoint.lstrip('/')}"
+        url = _build_url(self.base_url, self.auth.system_id, endpoint)
         
-        # Prepare headers
-        headers = {
-            "Authorization": f"Bearer {self.auth_data['system_token']}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        # Prepare headers from the cached parts
+        headers = {"Authorization": self._auth_header, **self._post_headers}
         
         try:
-            # Make request with proper authorization
-            response = requests.post(url, headers=headers, json={})
-            response.raise_for_status()
-            
+            # Make request on the shared keep-alive session
+            response = self.session.post(url, headers=headers, json={}, timeout=(3, 10), stream=True)
+            try:
+                response.raise_for_status()
+            finally:
+                # 204 carries no body; close unconditionally so the pooled
+                # connection is released even when raise_for_status raises
+                response.close()
+
             # If we get here, the request was successful (204 No Content)
             success = True
             status = "SUCCESS"
-            self.logger.info(f"Successfully closed device {device_id}")
+            self.logger.info("Successfully closed device %s", device_id)
         except Exception as e:
-            self.logger.error(f"Failed to close device: {str(e)}")
+            self.logger.error("Failed to close device: %s", e)
             success = False
             status = "FAILED"
         
@@ -70,6 +68,30 @@ class PDKDeviceCloseEndpoint(BaseAPI):
         
         return success
 
+    def close_devices(self, pairs: List[Tuple[str, str]], max_workers: int = 8) -> List[Tuple[str, bool]]:
+        """Close several devices in parallel.
+
+        Args:
+            pairs (list): (cloud_node_id, device_id) tuples to close
+            max_workers (int): Maximum concurrent requests; keep at or below
+                the session adapter's pool size so connections are reused
+
+        Returns:
+            List[Tuple[str, bool]]: (device_id, success) per pair, in input order
+        """
+        if not pairs:
+            return []
+
+        # Validate tokens once up front so workers hit the in-memory cache
+        self._refresh_if_needed()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                lambda pair: (pair[1], self.close_device(pair[0], pair[1])),
+                pairs
+            ))
+        return results
+
 def main():
     try:
         # Initialize all PDK endpoint handlers
@@ -171,16 +193,22 @@ def main():
                 print(f"\nFailed to close {selected_device['name']}")
             
             # Show recent activity
-            activities = pdk_close.activity_manager.get_device_activity(selected_device['id'])
+            activities = pdk_close.activity_manager.get_device_activity(
+                selected_device['id'], limit=5)
             print("\nRecent Device Activity:")
-            print(json.dumps(activities[:5], indent=2))  # Show last 5 activities
+            print(json.dumps(activities, indent=2))  # Show last 5 activities
             
         except Exception as e:
             print(f"Error: {str(e)}")
         
     except Exception as e:
-        logger.error(f"Error in main: {str(e)}")
+        logger.error("Error in main: %s", e)
         raise
 
 if __name__ == "__main__":
+    # Configure logging only for script use; library imports stay silent
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     main() 
\ No newline at end of file
@@ -1,21 +1,58 @@
+import atexit
 import json
+import orjson
 import logging
 import sqlite3
 import os
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+from ..auth import _build_url
 from ..system_functions.list_cloud_nodes import PDKEndpoint, BaseAPI
 from ..system_functions.list_devices import PDKDeviceEndpoint
-import requests
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger('PDKDeviceControl')
 
+# Column order of _SQL_SELECT_ACTIVITY; zipped against each row so dict
+# construction happens in C instead of a literal-per-key Python loop
+_ACTIVITY_KEYS = ('id', 'deviceId', 'cloudNodeId', 'action', 'status', 'response', 'timestamp')
+_ACTIVITY_RAW_KEYS = ('id', 'deviceId', 'cloudNodeId', 'action', 'status', 'responseRaw', 'timestamp')
+
 class GateActivityManager:
+
+    # Hoisted SQL so sqlite3's per-connection statement cache (keyed by the
+    # SQL string) reuses the compiled plan instead of re-parsing per call
+    _SQL_INSERT = '''
+        INSERT INTO gate_activity (
+            device_id, cloud_node_id, action, status, response, timestamp
+        ) VALUES (?, ?, ?, ?, ?, ?)
+    '''
+    _SQL_SELECT_ACTIVITY = '''
+        SELECT id, device_id, cloud_node_id, action, status, response, timestamp
+        FROM gate_activity
+        WHERE device_id = ?
+        ORDER BY timestamp DESC
+        LIMIT ? OFFSET ?
+    '''
+
+    # Buffered writes are flushed at most this often (seconds)
+    _FLUSH_INTERVAL = 0.5
+
+    # Process-wide instance shared by every endpoint so table setup and the
+    # long-lived connection happen once
+    _instance: Optional['GateActivityManager'] = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> 'GateActivityManager':
+        """Return the shared manager, creating it on first use"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
     def __init__(self, db_path=None):
         if db_path is None:
             # Get the repo root directory (parent of pdk_io_endpoints)
@@ -23,108 +60,205 @@ class GateActivityManager:
             db_path = os.path.join(repo_root, 'token.db')
         self.db_path = db_path
         self.logger = logging.getLogger('PDKDeviceControl.GateActivityManager')
+        # One long-lived connection instead of connect/close per call; the
+        # lock serializes the flusher thread against readers
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                     isolation_level=None,
+                                     cached_statements=256)
+        self._apply_pragmas(self._conn)
+        self._db_lock = threading.Lock()
+        # Write-behind buffer: log_activity only appends here; a background
+        # thread batches the rows into one transaction so a burst of device
+        # commands costs one commit instead of one per device
+        self._buf = deque()
+        self._buf_lock = threading.Lock()
+        self._flush_thread = None
         self._ensure_table_exists()
+        atexit.register(self.close)
 
-    def _ensure_table_exists(self):
-        """Create gate_activity table if it doesn't exist"""
-        conn = None
+    def _apply_pragmas(self, conn):
+        """Apply performance PRAGMAs to a new connection.
+
+        WAL with synchronous=NORMAL turns the fsync-per-insert of the
+        default rollback journal into an in-memory WAL append; schedule a
+        periodic PRAGMA wal_checkpoint(TRUNCATE) if the WAL ever grows
+        unbounded under sustained writes.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS gate_activity (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    device_id TEXT,
-                    cloud_node_id TEXT,
-                    action TEXT,
-                    status TEXT,
-                    response TEXT,
-                    timestamp TIMESTAMP,
-                    FOREIGN KEY (device_id) REFERENCES devices (id),
-                    FOREIGN KEY (cloud_node_id) REFERENCES cloud_nodes (id)
-                )
-            ''')
-            conn.commit()
-            self.logger.info("Gate activity table initialized successfully")
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA cache_size=-2000")
+        except sqlite3.Error as e:
+            self.logger.error("Failed to apply database pragmas: %s", e)
+
+    def _start_flush_thread(self):
+        """Start the background flusher on first buffered write"""
+        if self._flush_thread is None or not self._flush_thread.is_alive():
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop,
+                name='GateActivityFlush',
+                daemon=True
+            )
+            self._flush_thread.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self._FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error("Background activity flush failed: %s", e)
+
+    def flush(self):
+        """Write any buffered activity rows to the database in one transaction"""
+        with self._buf_lock:
+            if not self._buf:
+                return
+            rows = list(self._buf)
+            self._buf.clear()
+
+        try:
+            with self._db_lock:
+                cursor = self._conn.cursor()
+                cursor.execute('BEGIN')
+                try:
+                    cursor.executemany(self._SQL_INSERT, rows)
+                    cursor.execute('COMMIT')
+                except Exception:
+                    cursor.execute('ROLLBACK')
+                    raise
+            self.logger.debug("Flushed %d buffered activity rows", len(rows))
         except sqlite3.Error as e:
-            self.logger.error(f"Database initialization error: {str(e)}")
+            # Put the rows back so the next flush retries them
+            with self._buf_lock:
+                self._buf.extendleft(reversed(rows))
+            self.logger.error("Failed to flush gate activity: %s", e)
             raise
-        finally:
-            if conn:
-                conn.close()
 
-    def log_activity(self, device_id: str, cloud_node_id: str, action: str, 
-                    status: str, response: Dict[str, Any]):
-        """Log a gate activity event"""
-        conn = None
+    def close(self):
+        """Flush pending rows and close the long-lived connection"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            now = datetime.utcnow()
-
-            cursor.execute('''
-                INSERT INTO gate_activity (
-                    device_id, cloud_node_id, action, status, response, timestamp
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                device_id,
-                cloud_node_id,
-                action,
-                status,
-                json.dumps(response),
-                now
-            ))
+            self.flush()
+        finally:
+            with self._db_lock:
+                try:
+                    self._conn.close()
+                except sqlite3.Error as e:
+                    self.logger.error("Failed to close activity database: %s", e)
 
-            conn.commit()
-            self.logger.info(f"Logged {action} activity for device {device_id}")
+    def _ensure_table_exists(self):
+        """Create gate_activity table if it doesn't exist"""
+        try:
+            with self._db_lock:
+                self._conn.execute('''
+                    CREATE TABLE IF NOT EXISTS gate_activity (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        device_id TEXT,
+                        cloud_node_id TEXT,
+                        action TEXT,
+                        status TEXT,
+                        response TEXT,
+                        timestamp TIMESTAMP,
+                        FOREIGN KEY (device_id) REFERENCES devices (id),
+                        FOREIGN KEY (cloud_node_id) REFERENCES cloud_nodes (id)
+                    )
+                ''')
+                # Migrate legacy datetime-string rows to epoch microseconds:
+                # SQLite sorts TEXT above INTEGER, so a single leftover text
+                # row would outrank every new row in ORDER BY timestamp DESC
+                self._conn.execute('''
+                    UPDATE gate_activity
+                    SET timestamp = CAST(strftime('%s', timestamp) AS INTEGER) * 1000000
+                    WHERE typeof(timestamp) = 'text'
+                ''')
+                # get_device_activity filters by device and sorts newest-first;
+                # this index serves both without a scan-and-sort
+                self._conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_gate_activity_device_time
+                    ON gate_activity(device_id, timestamp DESC)
+                ''')
+                self._conn.execute('ANALYZE gate_activity')
+            self.logger.info("Gate activity table initialized successfully")
         except sqlite3.Error as e:
-            self.logger.error(f"Failed to log gate activity: {str(e)}")
+            self.logger.error("Database initialization error: %s", e)
             raise
-        finally:
-            if conn:
-                conn.close()
 
-    def get_device_activity(self, device_id: str) -> List[Dict[str, Any]]:
-        """Retrieve activity history for a specific device"""
-        conn = None
+    def log_activity(self, device_id: str, cloud_node_id: str, action: str,
+                    status: str, response: Dict[str, Any]):
+        """Queue a gate activity event for the background flusher"""
+        row = (
+            device_id,
+            cloud_node_id,
+            action,
+            status,
+            orjson.dumps(response).decode(),
+            # Epoch microseconds: no datetime allocation or adapter call per
+            # row, and integer order matches the timestamp index
+            time.time_ns() // 1000
+        )
+        with self._buf_lock:
+            self._buf.append(row)
+        self._start_flush_thread()
+        self.logger.info("Logged %s activity for device %s", action, device_id)
+
+    def iter_device_activity(self, device_id: str, limit: int = 100,
+                             offset: int = 0, decode_response: bool = True):
+        """Lazily yield activity dicts for a device, newest first.
+
+        The rows themselves are fetched in one locked pass (bounded by
+        limit), but dict construction and response decoding happen per
+        yield, so islice-style consumers only pay for what they take.
+
+        Args:
+            device_id (str): ID of the device
+            limit (int): Maximum number of rows to fetch
+            offset (int): Number of rows to skip for pagination
+            decode_response (bool): Decode the stored response JSON; pass
+                False to get the raw string under 'responseRaw' and skip
+                the per-row decode
+        """
+        # Make sure buffered writes are visible to this read
+        self.flush()
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM gate_activity 
-                WHERE device_id = ? 
-                ORDER BY timestamp DESC
-            ''', (device_id,))
-            rows = cursor.fetchall()
-
-            activities = []
-            for row in rows:
-                activity = {
-                    'id': row[0],
-                    'deviceId': row[1],
-                    'cloudNodeId': row[2],
-                    'action': row[3],
-                    'status': row[4],
-                    'response': json.loads(row[5]),
-                    'timestamp': row[6]
-                }
-                activities.append(activity)
-
-            self.logger.info(f"Retrieved {len(activities)} activities for device {device_id}")
-            return activities
+            with self._db_lock:
+                cursor = self._conn.cursor()
+                cursor.execute(self._SQL_SELECT_ACTIVITY, (device_id, limit, offset))
+                rows = cursor.fetchall()
         except sqlite3.Error as e:
-            self.logger.error(f"Failed to retrieve gate activities: {str(e)}")
+            self.logger.error("Failed to retrieve gate activities: %s", e)
             raise
-        finally:
-            if conn:
-                conn.close()
+
+        if decode_response:
+            for r in rows:
+                yield dict(zip(_ACTIVITY_KEYS,
+                               (r[0], r[1], r[2], r[3], r[4], orjson.loads(r[5]), r[6])))
+        else:
+            for r in rows:
+                yield dict(zip(_ACTIVITY_RAW_KEYS, r))
+
+    def get_device_activity(self, device_id: str, limit: int = 100,
+                            offset: int = 0,
+                            decode_response: bool = True) -> List[Dict[str, Any]]:
+        """Retrieve activity history for a specific device, newest first.
+
+        List-materializing wrapper over iter_device_activity; see it for
+        the argument details.
+        """
+        activities = list(self.iter_device_activity(
+            device_id, limit=limit, offset=offset, decode_response=decode_response))
+        self.logger.info("Retrieved %d activities for device %s", len(activities), device_id)
+        return activities
 
 class PDKDeviceControlEndpoint(BaseAPI):
     """PDK Device Control endpoint handler"""
     
     def __init__(self, base_url: str = "https://systems.pdk.io"):
         super().__init__(base_url)
-        self.activity_manager = GateActivityManager()
+        self.activity_manager = GateActivityManager.get()
+        self._post_headers = {**self._base_headers, "Content-Type": "application/json"}
     
     def toggle_device(self, cloud_node_id: str, device_id: str, dwell: Optional[int] = None) -> bool:
         """Toggle a device's state (open if closed, close if open).
@@ -142,14 +276,10 @@ class PDKDeviceControlEndpoint(BaseAPI):
         
         # Build endpoint URL
         endpoint = f"cloud-nodes/{cloud_node_id}/devices/{device_id}/try-open"
-        url = f"{self.base_url}/{self.auth.system_id}/{endpoint.lstrip('/')}"
+        url = _build_url(self.base_url, self.auth.system_id, endpoint)
         
-        # Prepare headers
-        headers = {
-            "Authorization": f"Bearer {self.auth_data['system_token']}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        # Prepare headers from the cached parts
+        headers = {"Authorization": self._auth_header, **self._post_headers}
         
         # Prepare request data
         data = {}
@@ -159,16 +289,21 @@ class PDKDeviceControlEndpoint(BaseAPI):
             data['dwell'] = dwell
             
         try:
-            # Make request with proper authorization
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            
+            # Make request on the shared keep-alive session
+            response = self.session.post(url, headers=headers, json=data, timeout=(3, 10), stream=True)
+            try:
+                response.raise_for_status()
+            finally:
+                # 204 carries no body; close unconditionally so the pooled
+                # connection is released even when raise_for_status raises
+                response.close()
+
             # If we get here, the request was successful (204 No Content)
             success = True
             status = "SUCCESS"
-            self.logger.info(f"Successfully toggled device {device_id}")
+            self.logger.info("Successfully toggled device %s", device_id)
         except Exception as e:
-            self.logger.error(f"Failed to toggle device: {str(e)}")
+            self.logger.error("Failed to toggle device: %s", e)
             success = False
             status = "FAILED"
         
@@ -183,6 +318,32 @@ class PDKDeviceControlEndpoint(BaseAPI):
         
         return success
 
+    def toggle_devices(self, triples: List[Tuple[str, str, Optional[int]]],
+                       max_workers: int = 8) -> List[Tuple[str, bool]]:
+        """Toggle several devices in parallel.
+
+        Args:
+            triples (list): (cloud_node_id, device_id, dwell) tuples; dwell
+                may be None for the device default
+            max_workers (int): Maximum concurrent requests; keep at or below
+                the session adapter's pool size so connections are reused
+
+        Returns:
+            List[Tuple[str, bool]]: (device_id, success) per triple, in input order
+        """
+        if not triples:
+            return []
+
+        # Validate tokens once up front so workers hit the in-memory cache
+        self._refresh_if_needed()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                lambda t: (t[1], self.toggle_device(t[0], t[1], t[2])),
+                triples
+            ))
+        return results
+
 def main():
     try:
         # Initialize all PDK endpoint handlers
@@ -210,6 +371,15 @@ def main():
             print(f"   IP: {node.get('ipv4Address', 'N/A')}")
         print("-" * 50)
 
+        # Prefetch device lists for every node while the user decides, so
+        # the selection below is served from an already-completed future
+        executor = ThreadPoolExecutor(max_workers=8)
+        device_futures = {
+            node['id']: executor.submit(
+                pdk_devices.list_devices_on_cloud_node, node['id'], node['name'])
+            for node in cloud_nodes
+        }
+
         # Get cloud node selection
         while True:
             try:
@@ -230,10 +400,8 @@ def main():
         # Get devices for selected node
         print(f"\n=== Getting Devices for: {selected_node['name']} ===")
         try:
-            devices = pdk_devices.list_devices_on_cloud_node(
-                selected_node['id'],
-                selected_node['name']
-            )
+            devices = device_futures[selected_node['id']].result()
+            executor.shutdown(wait=False)
             
             if not devices or len(devices) == 0:
                 print("\nNo devices available on this node.")
@@ -307,16 +475,22 @@ def main():
                 print(f"\nFailed to toggle {selected_device['name']}")
             
             # Show recent activity
-            activities = pdk_control.activity_manager.get_device_activity(selected_device['id'])
+            activities = pdk_control.activity_manager.get_device_activity(
+                selected_device['id'], limit=5)
             print("\nRecent Device Activity:")
-            print(json.dumps(activities[:5], indent=2))  # Show last 5 activities
+            print(json.dumps(activities, indent=2))  # Show last 5 activities
             
         except Exception as e:
             print(f"Error: {str(e)}")
         
     except Exception as e:
-        logger.error(f"Error in main: {str(e)}")
+        logger.error("Error in main: %s", e)
         raise
 
 if __name__ == "__main__":
+    # Configure logging only for script use; library imports stay silent
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     main() 
\ No newline at end of file
@@ -1,19 +1,126 @@
+import atexit
+import functools
 import json
+import orjson
 import logging
+import queue
 import sqlite3
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from ..auth import BaseAPI
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger('PDKEndpoint')
 
+@functools.lru_cache(maxsize=4096)
+def _parse_json(text):
+    """Memoized decode for JSON columns (accepts str or bytes).
+
+    The same short status blobs recur across rows and refreshes, so the
+    hit rate is high. Cached values are shared between callers — treat
+    them as read-only.
+    """
+    return orjson.loads(text)
+
+# Databases whose DDL has already run this process; endpoint classes build
+# a manager per instance, and the CREATE TABLE/INDEX only needs to run once
+_tables_initialized: set = set()
+_tables_init_lock = threading.Lock()
+
+# Write-behind queue: API calls hand their database writeback to a single
+# background writer thread and return as soon as the HTTP result is ready.
+# The tables are caches, so a write landing moments later is harmless.
+_writer_queue: 'queue.Queue' = queue.Queue()
+_writer_started = False
+_writer_lock = threading.Lock()
+
+def _writer_loop():
+    while True:
+        func, args = _writer_queue.get()
+        try:
+            func(*args)
+        except Exception:
+            logger.exception("Background database write failed")
+        finally:
+            _writer_queue.task_done()
+
+def _enqueue_write(func, *args):
+    """Queue a database write for the background writer thread"""
+    global _writer_started
+    if not _writer_started:
+        with _writer_lock:
+            if not _writer_started:
+                threading.Thread(target=_writer_loop, daemon=True,
+                                 name='pdk-db-writer').start()
+                # Drain pending writes before interpreter teardown
+                atexit.register(_writer_queue.join)
+                _writer_started = True
+    _writer_queue.put((func, args))
+
+def flush_writes():
+    """Block until every queued background database write has landed.
+
+    Call before reading a table that must reflect a just-fetched result,
+    e.g. the interactive mains that display database contents right after
+    a list call.
+    """
+    _writer_queue.join()
+
+# Column order of the cloud_nodes SELECTs; zipped against each row so dict
+# construction happens in C instead of a literal-per-key Python loop
+_NODE_KEYS = ('id', 'name', 'serialNumber', 'syncStatus', 'connectionStatus',
+              'softwareVersion', 'macAddress', 'ipv4Address', 'ipv6Address',
+              'lastUpdated')
+
+def _node_row_to_dict(row):
+    """Map a cloud_nodes row to the API-shaped dict"""
+    return dict(zip(_NODE_KEYS,
+                    (row[0], row[1], row[2], _parse_json(row[3]),
+                     _parse_json(row[4]), _parse_json(row[5]),
+                     row[6], row[7], row[8], row[9])))
+
 class CloudNodeManager:
+
+    # Hoisted SQL so sqlite3's per-connection statement cache (keyed by the
+    # SQL string) reuses the compiled plan instead of re-parsing per call
+    # Native UPSERT updates the existing row in place, where INSERT OR
+    # REPLACE deletes it and inserts a new one (rewriting indexes and
+    # invalidating the rowid referenced by the devices FK)
+    _SQL_UPSERT = '''
+        INSERT INTO cloud_nodes (
+            id, name, serial_number, sync_status, connection_status,
+            software_version, mac_address, ipv4_address, ipv6_address,
+            last_updated
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            name = excluded.name,
+            serial_number = excluded.serial_number,
+            sync_status = excluded.sync_status,
+            connection_status = excluded.connection_status,
+            software_version = excluded.software_version,
+            mac_address = excluded.mac_address,
+            ipv4_address = excluded.ipv4_address,
+            ipv6_address = excluded.ipv6_address,
+            last_updated = excluded.last_updated
+    '''
+    # Explicit projection (in _NODE_KEYS order) so row shape stays stable
+    # across schema migrations and SQLite skips unrequested columns
+    _NODE_COLUMNS = ('id, name, serial_number, sync_status, connection_status, '
+                     'software_version, mac_address, ipv4_address, ipv6_address, '
+                     'last_updated')
+    _SQL_GET_BY_NAME = f'SELECT {_NODE_COLUMNS} FROM cloud_nodes WHERE name = ?'
+    _SQL_GET_ALL = f'SELECT {_NODE_COLUMNS} FROM cloud_nodes'
+    _SQL_MAX_UPDATED = 'SELECT MAX(last_updated) FROM cloud_nodes'
+    # Listing UIs only need a few scalars; project them explicitly and let
+    # SQLite's C JSON1 extension pull 'connected' out of the status blob
+    _SQL_GET_SUMMARY = '''
+        SELECT id, name, serial_number, ipv4_address,
+               json_extract(connection_status, '$.connected')
+        FROM cloud_nodes
+    '''
+
     def __init__(self, db_path=None):
         if db_path is None:
             # Get the repo root directory (parent of pdk_io_endpoints)
@@ -21,59 +128,92 @@ class CloudNodeManager:
             db_path = os.path.join(repo_root, 'token.db')
         self.db_path = db_path
         self.logger = logging.getLogger('PDKEndpoint.CloudNodeManager')
+        # One long-lived connection per thread instead of connect/close per call
+        self._local = threading.local()
         self._ensure_table_exists()
+        atexit.register(self.close)
+
+    def _conn(self):
+        """Get (or lazily create) the long-lived connection for this thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._apply_pragmas(conn)
+            self._local.conn = conn
+        return conn
+
+    def _apply_pragmas(self, conn):
+        """Apply performance PRAGMAs to a new connection"""
+        try:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA cache_size=-2000")
+        except sqlite3.Error as e:
+            self.logger.error("Failed to apply database pragmas: %s", e)
+
+    def close(self):
+        """Close this thread's long-lived connection if one was opened"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                self.logger.error("Failed to close database connection: %s", e)
+            self._local.conn = None
 
     def _ensure_table_exists(self):
-        """Create cloud_nodes table if it doesn't exist"""
-        conn = None
+        """Create cloud_nodes table if it doesn't exist (once per process)"""
+        if self.db_path in _tables_initialized:
+            return
+        with _tables_init_lock:
+            if self.db_path in _tables_initialized:
+                return
+            self._run_table_ddl()
+            _tables_initialized.add(self.db_path)
+
+    def _run_table_ddl(self):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS cloud_nodes (
                     id TEXT PRIMARY KEY,
                     name TEXT,
                     serial_number TEXT,
-                    sync_status TEXT,
+                    sync_status BLOB,
                     connection_status TEXT,
-                    software_version TEXT,
+                    software_version BLOB,
                     mac_address TEXT,
                     ipv4_address TEXT,
                     ipv6_address TEXT,
                     last_updated TIMESTAMP
                 )
             ''')
+            # get_cloud_node_by_name filters on name; index it so the lookup
+            # is a B-tree probe instead of a full table scan
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_cloud_nodes_name
+                ON cloud_nodes(name)
+            ''')
             conn.commit()
             self.logger.info("Cloud nodes table initialized successfully")
         except sqlite3.Error as e:
             self.logger.error(f"Database initialization error: {str(e)}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
     def get_cloud_node_by_name(self, node_name: str) -> Optional[Dict[str, Any]]:
         """Retrieve a cloud node by its name"""
-        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM cloud_nodes WHERE name = ?', (node_name,))
+            cursor.execute(self._SQL_GET_BY_NAME, (node_name,))
             row = cursor.fetchone()
 
             if row:
-                node = {
-                    'id': row[0],
-                    'name': row[1],
-                    'serialNumber': row[2],
-                    'syncStatus': json.loads(row[3]),
-                    'connectionStatus': json.loads(row[4]),
-                    'softwareVersion': json.loads(row[5]),
-                    'macAddress': row[6],
-                    'ipv4Address': row[7],
-                    'ipv6Address': row[8],
-                    'lastUpdated': row[9]
-                }
+                node = _node_row_to_dict(row)
                 self.logger.info(f"Retrieved cloud node with name: {node_name}")
                 return node
             else:
@@ -82,85 +222,112 @@ class CloudNodeManager:
         except sqlite3.Error as e:
             self.logger.error(f"Failed to retrieve cloud node by name: {str(e)}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
     def update_cloud_nodes(self, nodes: List[Dict[str, Any]]):
         """Update cloud nodes in the database"""
-        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
             now = datetime.utcnow()
 
-            for node in nodes:
-                # Convert nested dictionaries to JSON strings
-                sync_status = json.dumps(node.get('syncStatus', {}))
-                connection_status = json.dumps(node.get('connectionStatus', {}))
-                software_version = json.dumps(node.get('softwareVersion', {}))
-
-                cursor.execute('''
-                    INSERT OR REPLACE INTO cloud_nodes (
-                        id, name, serial_number, sync_status, connection_status,
-                        software_version, mac_address, ipv4_address, ipv6_address,
-                        last_updated
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+            # One executemany inside a single transaction instead of a
+            # Python-level execute per node
+            rows = (
+                (
                     node.get('id'),
                     node.get('name'),
                     node.get('serialNumber'),
-                    sync_status,
-                    connection_status,
-                    software_version,
+                    orjson.dumps(node.get('syncStatus', {})),
+                    # connection_status stays TEXT: json_extract in the
+                    # summary query rejects raw JSON stored as a blob
+                    orjson.dumps(node.get('connectionStatus', {})).decode(),
+                    orjson.dumps(node.get('softwareVersion', {})),
                     node.get('macAddress'),
                     node.get('ipv4Address'),
                     node.get('ipv6Address'),
                     now
-                ))
+                )
+                for node in nodes
+            )
+            cursor.executemany(self._SQL_UPSERT, rows)
 
             conn.commit()
             self.logger.info(f"Updated {len(nodes)} cloud nodes in database")
         except sqlite3.Error as e:
             self.logger.error(f"Failed to update cloud nodes: {str(e)}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
-    def get_cloud_nodes(self) -> List[Dict[str, Any]]:
-        """Retrieve all cloud nodes from the database"""
-        conn = None
+    def get_cloud_nodes_if_fresh(self, max_age_seconds: float) -> Optional[List[Dict[str, Any]]]:
+        """Return cached cloud nodes if the last refresh is recent enough.
+
+        Args:
+            max_age_seconds (float): Maximum age of the cached rows
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Cached nodes, or None when the
+                cache is empty or stale
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM cloud_nodes')
-            rows = cursor.fetchall()
+            cursor.execute(self._SQL_MAX_UPDATED)
+            last_updated = cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            self.logger.error(f"Failed to check cloud node cache age: {str(e)}")
+            return None
 
-            nodes = []
-            for row in rows:
-                node = {
+        if not last_updated:
+            return None
+        try:
+            age = (datetime.utcnow() - datetime.fromisoformat(last_updated)).total_seconds()
+        except ValueError:
+            return None
+        if age > max_age_seconds:
+            return None
+        return self.get_cloud_nodes()
+
+    def get_cloud_nodes_summary(self) -> List[Dict[str, Any]]:
+        """Retrieve just the fields the listing UIs display.
+
+        Returns:
+            List[Dict[str, Any]]: One dict per node with id, name,
+                serialNumber, ipv4Address and connected (bool or None)
+        """
+        try:
+            conn = self._conn()
+            cursor = conn.cursor()
+            cursor.execute(self._SQL_GET_SUMMARY)
+            summaries = [
+                {
                     'id': row[0],
                     'name': row[1],
                     'serialNumber': row[2],
-                    'syncStatus': json.loads(row[3]),
-                    'connectionStatus': json.loads(row[4]),
-                    'softwareVersion': json.loads(row[5]),
-                    'macAddress': row[6],
-                    'ipv4Address': row[7],
-                    'ipv6Address': row[8],
-                    'lastUpdated': row[9]
+                    'ipv4Address': row[3],
+                    'connected': bool(row[4]) if row[4] is not None else None
                 }
-                nodes.append(node)
+                for row in cursor.fetchall()
+            ]
+            self.logger.info("Retrieved %d cloud node summaries from database", len(summaries))
+            return summaries
+        except sqlite3.Error as e:
+            self.logger.error(f"Failed to retrieve cloud node summaries: {str(e)}")
+            raise
+
+    def get_cloud_nodes(self) -> List[Dict[str, Any]]:
+        """Retrieve all cloud nodes from the database"""
+        try:
+            conn = self._conn()
+            cursor = conn.cursor()
+            cursor.execute(self._SQL_GET_ALL)
+            rows = cursor.fetchall()
+
+            nodes = [_node_row_to_dict(row) for row in rows]
 
             self.logger.info(f"Retrieved {len(nodes)} cloud nodes from database")
             return nodes
         except sqlite3.Error as e:
             self.logger.error(f"Failed to retrieve cloud nodes: {str(e)}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
 class PDKEndpoint(BaseAPI):
     """PDK API endpoint handler"""
@@ -169,16 +336,28 @@ class PDKEndpoint(BaseAPI):
         super().__init__(base_url)
         self.cloud_node_manager = CloudNodeManager()
     
-    def list_cloud_nodes(self, page: Optional[int] = None, per_page: Optional[int] = None) -> Dict[str, Any]:
+    def list_cloud_nodes(self, page: Optional[int] = None, per_page: Optional[int] = None,
+                         max_age: Optional[float] = 60) -> Dict[str, Any]:
         """List all cloud nodes for the system.
-        
+
         Args:
             page (int, optional): Zero-based page number for pagination (default: 0)
             per_page (int, optional): Number of items per page (default: 10, max: 100)
-            
+            max_age (float, optional): Serve the list from the local database
+                when it was refreshed within this many seconds; pass None to
+                always hit the API
+
         Returns:
             Dict[str, Any]: Response containing array of cloud node objects
         """
+        # Unpaginated listings can ride the short-TTL database cache so
+        # back-to-back interactive runs skip the network round-trip
+        if max_age is not None and page is None and per_page is None:
+            cached = self.cloud_node_manager.get_cloud_nodes_if_fresh(max_age)
+            if cached is not None:
+                self.logger.info("Serving %d cloud nodes from local cache", len(cached))
+                return cached
+
         params = {}
         if page is not None:
             params["page"] = page
@@ -187,12 +366,50 @@ class PDKEndpoint(BaseAPI):
             
         result = self.get('cloud-nodes', params=params)
         
-        # Update cloud nodes in database
+        # Update cloud nodes in database off the critical path
         if isinstance(result, list):
-            self.cloud_node_manager.update_cloud_nodes(result)
-        
+            _enqueue_write(self.cloud_node_manager.update_cloud_nodes, result)
+
         return result
 
+    def list_all_cloud_nodes(self, per_page: int = 100,
+                             max_workers: int = 4) -> List[Dict[str, Any]]:
+        """Collect every page of cloud nodes, fetching pages concurrently.
+
+        The API reports no total count, so the first page is fetched alone;
+        after that pages are requested in waves of max_workers on the shared
+        keep-alive session until a short or empty page marks the end.
+
+        Args:
+            per_page (int): Page size to request (max: 100)
+            max_workers (int): Pages fetched concurrently per wave
+
+        Returns:
+            List[Dict[str, Any]]: All cloud node objects across pages
+        """
+        first = self.list_cloud_nodes(page=0, per_page=per_page, max_age=None)
+        nodes = list(first) if isinstance(first, list) else []
+        if len(nodes) < per_page:
+            return nodes
+
+        next_page = 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                futures = [
+                    executor.submit(self.list_cloud_nodes, page, per_page, None)
+                    for page in range(next_page, next_page + max_workers)
+                ]
+                finished = False
+                for future in futures:
+                    result = future.result()
+                    batch = result if isinstance(result, list) else []
+                    nodes.extend(batch)
+                    if len(batch) < per_page:
+                        finished = True
+                if finished:
+                    return nodes
+                next_page += max_workers
+
 def main():
     try:
         # Initialize PDK endpoint handler
@@ -206,7 +423,9 @@ def main():
         print("\nCloud Nodes from API:")
         print(json.dumps(cloud_nodes, indent=2))
         
-        # Retrieve and display nodes from database
+        # Retrieve and display nodes from database; drain the background
+        # writer first so the just-fetched result is visible
+        flush_writes()
         print("\nCloud Nodes from Database:")
         db_nodes = pdk.cloud_node_manager.get_cloud_nodes()
         print(json.dumps(db_nodes, indent=2))
@@ -216,4 +435,9 @@ def main():
         raise
 
 if __name__ == "__main__":
+    # Configure logging only for script use; library imports stay silent
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     main()
@@ -1,19 +1,93 @@
+import atexit
 import json
+import orjson
 import logging
 import sqlite3
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, Optional, List
-from .list_cloud_nodes import PDKEndpoint, BaseAPI
+from .list_cloud_nodes import PDKEndpoint, BaseAPI, _parse_json, _enqueue_write, flush_writes
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger('PDKDevices')
 
+# Databases whose DDL has already run this process (separate from the
+# cloud_nodes set — same file, different table)
+_tables_initialized: set = set()
+_tables_init_lock = threading.Lock()
+
+# Column order of the devices SELECT; zipped against each row so dict
+# construction happens in C instead of a literal-per-key Python loop
+_DEVICE_KEYS = ('id', 'cloudNodeId', 'port', 'delay', 'dwell', 'dps', 'rex',
+                'name', 'connection', 'forcedAlarm', 'autoOpenAfterFirstAllow',
+                'propAlarm', 'propDelay', 'firmwareVersion', 'hardwareVersion',
+                'serialNumber', 'inputTypes', 'osdpAddress', 'partition',
+                'authenticationPolicy', 'reader', 'type', 'publicIcon',
+                'readerType', 'lastUpdated')
+
+# Explicit projection (in _DEVICE_KEYS order) so row shape stays stable
+# across schema migrations and SQLite skips unrequested columns
+_DEVICE_COLUMNS = ('id, cloud_node_id, port, delay, dwell, dps, rex, name, '
+                   'connection, forced_alarm, auto_open_after_first_allow, '
+                   'prop_alarm, prop_delay, firmware_version, hardware_version, '
+                   'serial_number, input_types, osdp_address, partition, '
+                   'authentication_policy, reader, type, public_icon, '
+                   'reader_type, last_updated')
+
+def _device_row_to_dict(row):
+    """Map a devices row to the API-shaped dict"""
+    values = list(row)
+    values[16] = _parse_json(values[16])
+    values[18] = _parse_json(values[18])
+    values[20] = _parse_json(values[20])
+    return dict(zip(_DEVICE_KEYS, values))
+
 class DeviceManager:
+
+    # Hoisted SQL so sqlite3's per-connection statement cache (keyed by the
+    # SQL string) reuses the compiled plan instead of re-parsing per call
+    # Native UPSERT updates the existing row in place, where INSERT OR
+    # REPLACE deletes it and inserts a new one (rewriting indexes and
+    # re-running the cloud_nodes FK check)
+    _SQL_UPSERT = '''
+        INSERT INTO devices (
+            id, cloud_node_id, port, delay, dwell, dps, rex, name,
+            connection, forced_alarm, auto_open_after_first_allow,
+            prop_alarm, prop_delay, firmware_version, hardware_version,
+            serial_number, input_types, osdp_address, partition,
+            authentication_policy, reader, type, public_icon,
+            reader_type, last_updated
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            cloud_node_id = excluded.cloud_node_id,
+            port = excluded.port,
+            delay = excluded.delay,
+            dwell = excluded.dwell,
+            dps = excluded.dps,
+            rex = excluded.rex,
+            name = excluded.name,
+            connection = excluded.connection,
+            forced_alarm = excluded.forced_alarm,
+            auto_open_after_first_allow = excluded.auto_open_after_first_allow,
+            prop_alarm = excluded.prop_alarm,
+            prop_delay = excluded.prop_delay,
+            firmware_version = excluded.firmware_version,
+            hardware_version = excluded.hardware_version,
+            serial_number = excluded.serial_number,
+            input_types = excluded.input_types,
+            osdp_address = excluded.osdp_address,
+            partition = excluded.partition,
+            authentication_policy = excluded.authentication_policy,
+            reader = excluded.reader,
+            type = excluded.type,
+            public_icon = excluded.public_icon,
+            reader_type = excluded.reader_type,
+            last_updated = excluded.last_updated
+    '''
+    _SQL_GET_FOR_NODE = f'SELECT {_DEVICE_COLUMNS} FROM devices WHERE cloud_node_id = ?'
+    _SQL_MAX_UPDATED = 'SELECT MAX(last_updated) FROM devices WHERE cloud_node_id = ?'
+
     def __init__(self, db_path=None):
         if db_path is None:
             # Get the repo root directory (parent of pdk_io_endpoints)
@@ -21,13 +95,55 @@ class DeviceManager:
             db_path = os.path.join(repo_root, 'token.db')
         self.db_path = db_path
         self.logger = logging.getLogger('PDKDevices.DeviceManager')
+        # One long-lived connection per thread instead of connect/close per call
+        self._local = threading.local()
         self._ensure_table_exists()
+        atexit.register(self.close)
+
+    def _conn(self):
+        """Get (or lazily create) the long-lived connection for this thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._apply_pragmas(conn)
+            self._local.conn = conn
+        return conn
+
+    def _apply_pragmas(self, conn):
+        """Apply performance PRAGMAs to a new connection"""
+        try:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA cache_size=-2000")
+        except sqlite3.Error as e:
+            self.logger.error("Failed to apply database pragmas: %s", e)
+
+    def close(self):
+        """Close this thread's long-lived connection if one was opened"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                self.logger.error("Failed to close database connection: %s", e)
+            self._local.conn = None
 
     def _ensure_table_exists(self):
-        """Create devices table if it doesn't exist"""
-        conn = None
+        """Create devices table if it doesn't exist (once per process)"""
+        if self.db_path in _tables_initialized:
+            return
+        with _tables_init_lock:
+            if self.db_path in _tables_initialized:
+                return
+            self._run_table_ddl()
+            _tables_initialized.add(self.db_path)
+
+    def _run_table_ddl(self):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS devices (
@@ -47,11 +163,11 @@ class DeviceManager:
                     firmware_version TEXT,
                     hardware_version TEXT,
                     serial_number TEXT,
-                    input_types TEXT,
+                    input_types BLOB,
                     osdp_address INTEGER,
-                    partition TEXT,
+                    partition BLOB,
                     authentication_policy TEXT,
-                    reader TEXT,
+                    reader BLOB,
                     type TEXT,
                     public_icon TEXT,
                     reader_type TEXT,
@@ -59,39 +175,30 @@ class DeviceManager:
                     FOREIGN KEY (cloud_node_id) REFERENCES cloud_nodes (id)
                 )
             ''')
+            # get_devices_for_node filters on the cloud_node_id FK; the
+            # compound (cloud_node_id, id) index turns the scan into a range
+            # probe and covers membership checks on its own
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_devices_cloud_node_id
+                ON devices(cloud_node_id, id)
+            ''')
             conn.commit()
             self.logger.info("Devices table initialized successfully")
         except sqlite3.Error as e:
             self.logger.error(f"Database initialization error: {str(e)}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
     def update_devices(self, cloud_node_id: str, devices: List[Dict[str, Any]]):
         """Update devices in the database for a specific cloud node"""
-        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
             now = datetime.utcnow()
 
-            for device in devices:
-                # Convert lists and nested objects to JSON strings
-                input_types = json.dumps(device.get('inputTypes', []))
-                partition = json.dumps(device.get('partition', []))
-                reader = json.dumps(device.get('reader'))
-
-                cursor.execute('''
-                    INSERT OR REPLACE INTO devices (
-                        id, cloud_node_id, port, delay, dwell, dps, rex, name,
-                        connection, forced_alarm, auto_open_after_first_allow,
-                        prop_alarm, prop_delay, firmware_version, hardware_version,
-                        serial_number, input_types, osdp_address, partition,
-                        authentication_policy, reader, type, public_icon,
-                        reader_type, last_updated
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+            # One executemany inside a single transaction instead of a
+            # Python-level execute per device
+            rows = (
+                (
                     device.get('id'),
                     cloud_node_id,
                     device.get('port'),
@@ -108,74 +215,71 @@ class DeviceManager:
                     device.get('firmwareVersion'),
                     device.get('hardwareVersion'),
                     device.get('serialNumber'),
-                    input_types,
+                    orjson.dumps(device.get('inputTypes', [])),
                     device.get('osdpAddress'),
-                    partition,
+                    orjson.dumps(device.get('partition', [])),
                     device.get('authenticationPolicy'),
-                    reader,
+                    orjson.dumps(device.get('reader')),
                     device.get('type'),
                     device.get('publicIcon'),
                     device.get('readerType'),
                     now
-                ))
+                )
+                for device in devices
+            )
+            cursor.executemany(self._SQL_UPSERT, rows)
 
             conn.commit()
             self.logger.info(f"Updated {len(devices)} devices for cloud node {cloud_node_id}")
         except sqlite3.Error as e:
             self.logger.error(f"Failed to update devices: {str(e)}")
             raise
-        finally:
-            if conn:
-                conn.close()
+
+    def get_devices_if_fresh(self, cloud_node_id: str, max_age_seconds: float) -> Optional[List[Dict[str, Any]]]:
+        """Return cached devices for a node if the last refresh is recent enough.
+
+        Args:
+            cloud_node_id (str): ID of the cloud node
+            max_age_seconds (float): Maximum age of the cached rows
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Cached devices, or None when the
+                cache is empty or stale
+        """
+        try:
+            conn = self._conn()
+            cursor = conn.cursor()
+            cursor.execute(self._SQL_MAX_UPDATED, (cloud_node_id,))
+            last_updated = cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            self.logger.error(f"Failed to check device cache age: {str(e)}")
+            return None
+
+        if not last_updated:
+            return None
+        try:
+            age = (datetime.utcnow() - datetime.fromisoformat(last_updated)).total_seconds()
+        except ValueError:
+            return None
+        if age > max_age_seconds:
+            return None
+        return self.get_devices_for_node(cloud_node_id)
 
     def get_devices_for_node(self, cloud_node_id: str) -> List[Dict[str, Any]]:
         """Retrieve all devices for a specific cloud node from the database"""
-        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conn()
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM devices WHERE cloud_node_id = ?', (cloud_node_id,))
+            cursor.execute(self._SQL_GET_FOR_NODE, (cloud_node_id,))
             rows = cursor.fetchall()
 
-            devices = []
-            for row in rows:
-                device = {
-                    'id': row[0],
-                    'cloudNodeId': row[1],
-                    'port': row[2],
-                    'delay': row[3],
-                    'dwell': row[4],
-                    'dps': row[5],
-                    'rex': row[6],
-                    'name': row[7],
-                    'connection': row[8],
-                    'forcedAlarm': row[9],
-                    'autoOpenAfterFirstAllow': row[10],
-                    'propAlarm': row[11],
-                    'propDelay': row[12],
-                    'firmwareVersion': row[13],
-                    'hardwareVersion': row[14],
-                    'serialNumber': row[15],
-                    'inputTypes': json.loads(row[16]),
-                    'osdpAddress': row[17],
-                    'partition': json.loads(row[18]),
-                    'authenticationPolicy': row[19],
-                    'reader': json.loads(row[20]),
-                    'type': row[21],
-                    'publicIcon': row[22],
-                    'readerType': row[23],
-                    'lastUpdated': row[24]
-                }
-                devices.append(device)
+            devices = [_device_row_to_dict(row) for row in rows]
 
             self.logger.info(f"Retrieved {len(devices)} devices for cloud node {cloud_node_id}")
             return devices
         except sqlite3.Error as e:
             self.logger.error(f"Failed to retrieve devices: {str(e)}")
             raise
-        finally:
-            if conn:
-                conn.close()
 
 class PDKDeviceEndpoint(BaseAPI):
     """PDK Device endpoint handler"""
@@ -184,27 +288,70 @@ class PDKDeviceEndpoint(BaseAPI):
         super().__init__(base_url)
         self.device_manager = DeviceManager()
     
-    def list_devices_on_cloud_node(self, cloud_node_id: str, cloud_node_name: str) -> List[Dict[str, Any]]:
+    def list_devices_on_cloud_node(self, cloud_node_id: str, cloud_node_name: str,
+                                   max_age: Optional[float] = 60) -> List[Dict[str, Any]]:
         """List all devices on a specific cloud node.
-        
+
         Args:
             cloud_node_id (str): ID of the cloud node to list devices for
             cloud_node_name (str): Name of the cloud node (for logging)
-            
+            max_age (float, optional): Serve the list from the local database
+                when it was refreshed within this many seconds; pass None to
+                always hit the API
+
         Returns:
             List[Dict[str, Any]]: List of device objects
         """
+        # Short-TTL database cache: repeat interactive runs against the same
+        # node skip the network round-trip
+        if max_age is not None:
+            cached = self.device_manager.get_devices_if_fresh(cloud_node_id, max_age)
+            if cached is not None:
+                self.logger.info("Serving %d devices for cloud node %s from local cache",
+                                 len(cached), cloud_node_name)
+                return cached
+
         # Get devices for the cloud node
         endpoint = f"cloud-nodes/{cloud_node_id}/devices"
         devices = self.get(endpoint)
         
-        # Update devices in database
+        # Update devices in database off the critical path
         if isinstance(devices, list):
-            self.device_manager.update_devices(cloud_node_id, devices)
-            self.logger.info(f"Updated {len(devices)} devices for cloud node: {cloud_node_name}")
+            _enqueue_write(self.device_manager.update_devices, cloud_node_id, devices)
+            self.logger.info("Queued %d devices for cloud node: %s", len(devices), cloud_node_name)
         
         return devices
 
+    def list_devices_on_cloud_nodes(self, nodes: List[Dict[str, Any]],
+                                    max_workers: int = 8,
+                                    max_age: Optional[float] = 60) -> Dict[str, List[Dict[str, Any]]]:
+        """List devices for several cloud nodes concurrently.
+
+        Args:
+            nodes (list): Cloud node dicts with at least 'id' and 'name'
+            max_workers (int): Maximum concurrent requests; keep at or below
+                the session adapter's pool size so connections are reused
+            max_age (float, optional): Per-node cache TTL, as in
+                list_devices_on_cloud_node
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Device lists keyed by node id
+        """
+        if not nodes:
+            return {}
+
+        # Validate tokens once up front so workers hit the in-memory cache
+        self._refresh_if_needed()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                node['id']: executor.submit(
+                    self.list_devices_on_cloud_node,
+                    node['id'], node.get('name', ''), max_age)
+                for node in nodes
+            }
+            return {node_id: future.result() for node_id, future in futures.items()}
+
 def main():
     try:
         # Initialize PDK endpoint handlers
@@ -219,18 +366,33 @@ def main():
             print("\nNo cloud nodes available.")
             return
 
-        # Display available cloud nodes
+        # Display available cloud nodes; the menu only shows a few scalars,
+        # so use the narrow summary projection instead of the full rows.
+        # Drain the background writer first so the just-fetched nodes are
+        # visible to the summary query
+        flush_writes()
+        node_summaries = pdk.cloud_node_manager.get_cloud_nodes_summary()
         print("\nAvailable Cloud Nodes:")
         print("-" * 50)
-        for idx, node in enumerate(cloud_nodes, 1):
+        for idx, node in enumerate(node_summaries, 1):
             print(f"{idx}. {node['name']} ({node['serialNumber']})")
-            if node.get('connectionStatus', {}).get('connected'):
+            if node.get('connected'):
                 print(f"   Status: Connected")
             else:
                 print(f"   Status: Disconnected")
             print(f"   IP: {node.get('ipv4Address', 'N/A')}")
         print("-" * 50)
 
+        # Speculatively prefetch devices for the connected nodes while the
+        # user is reading the menu; a hit below returns instantly and a miss
+        # falls back to the normal synchronous fetch
+        executor = ThreadPoolExecutor(max_workers=8)
+        device_futures = {
+            node['id']: executor.submit(
+                pdk_devices.list_devices_on_cloud_node, node['id'], node['name'])
+            for node in node_summaries if node.get('connected')
+        }
+
         # Get user selection
         while True:
             try:
@@ -240,23 +402,30 @@ def main():
                     return
                 
                 idx = int(selection)
-                if 1 <= idx <= len(cloud_nodes):
-                    selected_node = cloud_nodes[idx - 1]
+                if 1 <= idx <= len(node_summaries):
+                    selected_node = node_summaries[idx - 1]
                     break
                 else:
-                    print(f"Please enter a number between 1 and {len(cloud_nodes)}")
+                    print(f"Please enter a number between 1 and {len(node_summaries)}")
             except ValueError:
                 print("Please enter a valid number")
 
         # Get devices for selected node
         print(f"\n=== Getting Devices for: {selected_node['name']} ===")
         try:
-            devices = pdk_devices.list_devices_on_cloud_node(
-                selected_node['id'],
-                selected_node['name']
-            )
-            
-            # Display devices from database to verify storage
+            future = device_futures.get(selected_node['id'])
+            if future is not None:
+                devices = future.result()
+            else:
+                devices = pdk_devices.list_devices_on_cloud_node(
+                    selected_node['id'],
+                    selected_node['name']
+                )
+            executor.shutdown(wait=False)
+
+            # Display devices from database to verify storage; drain the
+            # background writer so the rows just fetched are in the table
+            flush_writes()
             db_devices = pdk_devices.device_manager.get_devices_for_node(selected_node['id'])
             
             print("\nDevices on Cloud Node (from API):")
@@ -272,4 +441,9 @@ def main():
         raise
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # Configure logging only for script use; library imports stay silent
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
\ No newline at end of file
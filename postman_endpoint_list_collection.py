@@ -1,18 +1,23 @@
 import requests
-import json
+import orjson
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime
 from functools import wraps
 from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
 
 class APIEndpoint:
     """Base class for API endpoints"""
-    def __init__(self, base_url: str = "https://systems.pdk.io"):
+    def __init__(self, base_url: str = "https://systems.pdk.io",
+                 session: Optional[requests.Session] = None):
         self.base_url = base_url
-        self.session = requests.Session()
+        # Accept a shared Session so all endpoint classes reuse one
+        # keep-alive connection pool instead of opening their own
+        self.session = session if session is not None else requests.Session()
     
     def _make_request(self, method: str, path: str, **kwargs) -> requests.Response:
         """Make HTTP request with error handling"""
@@ -65,10 +70,16 @@ class HolderRulesAPI(APIEndpoint):
 class PDKClient:
     """Main PDK API client"""
     def __init__(self, base_url: str = "https://systems.pdk.io"):
-        self.cloud_nodes = CloudNodesAPI(base_url)
-        self.devices = DevicesAPI(base_url)
-        self.reports = ReportsAPI(base_url)
-        self.holder_rules = HolderRulesAPI(base_url)
+        # One Session with a sized pool, shared by every endpoint class, so
+        # the TCP/TLS handshake to systems.pdk.io is paid once
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.cloud_nodes = CloudNodesAPI(base_url, session=self.session)
+        self.devices = DevicesAPI(base_url, session=self.session)
+        self.reports = ReportsAPI(base_url, session=self.session)
+        self.holder_rules = HolderRulesAPI(base_url, session=self.session)
 
 class PostmanCollectionParser:
     def __init__(self, url: str):
@@ -82,7 +93,10 @@ class PostmanCollectionParser:
         try:
             response = requests.get(self.url)
             response.raise_for_status()
-            self.collection_data = response.json()
+            # Parse the raw bytes directly with orjson rather than
+            # response.json(), which first decodes the body to str and then
+            # walks it with stdlib json — two full passes over a large blob
+            self.collection_data = orjson.loads(response.content)
             return True
         except requests.RequestException as e:
             print(f"Failed to fetch collection: {e}")
@@ -104,46 +118,54 @@ class PostmanCollectionParser:
 
     def _parse_request(self, request: Dict) -> Dict[str, Any]:
         """Parse request details into structured format."""
+        # Fetch the url sub-dict once and use `or ()` defaults so missing
+        # sections don't allocate throwaway empty containers; this runs once
+        # per endpoint across thousands of items
+        url = request.get('url') or {}
         parsed = {
             'method': request.get('method', ''),
-            'url': request.get('url', {}).get('raw', ''),
+            'url': url.get('raw', ''),
             'description': request.get('description', ''),
             'headers': [
-                {'key': h['key'], 'value': h['value']} 
-                for h in request.get('header', [])
+                {'key': h['key'], 'value': h['value']}
+                for h in request.get('header') or ()
             ],
             'params': [
-                {'key': p['key'], 'value': p['value']} 
-                for p in request.get('url', {}).get('query', [])
+                {'key': p['key'], 'value': p['value']}
+                for p in url.get('query') or ()
             ],
             'body': None
         }
 
-        if 'body' in request:
-            body = request['body']
-            if body.get('mode') == 'raw':
+        body = request.get('body')
+        if body:
+            mode = body.get('mode')
+            if mode == 'raw':
                 try:
-                    parsed['body'] = json.loads(body.get('raw', '{}'))
-                except json.JSONDecodeError:
+                    parsed['body'] = orjson.loads(body.get('raw', '{}'))
+                except orjson.JSONDecodeError:
                     parsed['body'] = body.get('raw')
-            elif body.get('mode') == 'formdata':
+            elif mode == 'formdata':
                 parsed['body'] = {
                     'formdata': [
                         {'key': f['key'], 'value': f['value'], 'type': f['type']}
-                        for f in body.get('formdata', [])
+                        for f in body.get('formdata') or ()
                     ]
                 }
 
         return parsed
 
     def _write_endpoint_file(self, folder_path: Path, name: str, data: Dict) -> None:
-        """Write endpoint details to file with proper formatting."""
-        # Create all parent directories
-        folder_path.mkdir(parents=True, exist_ok=True)
-        
+        """Write endpoint details to file with proper formatting.
+
+        The parent directory must already exist; process_collection creates
+        each folder once up front instead of per file.
+        """
         file_path = folder_path / f"{name}.json"
-        with file_path.open('w') as f:
-            json.dump(data, f, indent=2)
+        # orjson emits indented bytes in one shot, so the file is a single
+        # write instead of a json.dump chunk-by-chunk loop
+        file_path.write_bytes(orjson.dumps(
+            data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
 
     def process_collection(self) -> None:
         """Process and save the Postman collection maintaining folder structure."""
@@ -153,12 +175,16 @@ class PostmanCollectionParser:
 
         version_dir = self._create_folder_structure()
 
+        # Walk the tree first and collect write jobs; the writes themselves
+        # are I/O-bound and fan out across a thread pool afterwards
+        jobs: List[Tuple[Path, str, Dict]] = []
+
         def process_items(items: List[Dict], current_path: Path):
             for item in items:
                 if 'request' in item:  # This is an endpoint
                     request_data = self._parse_request(item['request'])
                     name = item.get('name', '').replace(' ', '_').lower()
-                    
+
                     endpoint_data = {
                         'info': {
                             'name': item.get('name', ''),
@@ -175,7 +201,7 @@ class PostmanCollectionParser:
                         ]
                     }
 
-                    self._write_endpoint_file(current_path, name, endpoint_data)
+                    jobs.append((current_path, name, endpoint_data))
 
                 elif 'item' in item:  # This is a folder
                     folder_name = item['name'].replace(' ', '_').lower()
@@ -184,7 +210,14 @@ class PostmanCollectionParser:
 
         # Start processing from root items
         process_items(self.collection_data['item'], version_dir)
-        
+
+        # Create each folder once instead of a mkdir per file, then write
+        # the files in parallel (write releases the GIL, so threads overlap)
+        for folder_path in {job[0] for job in jobs}:
+            folder_path.mkdir(parents=True, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(lambda job: self._write_endpoint_file(*job), jobs))
+
         # Write collection info
         collection_info = {
             'name': self.collection_data.get('info', {}).get('name', ''),
@@ -1,23 +1,28 @@
+import functools
+import hashlib
 import requests
-import json
+import orjson
 import sqlite3
 from datetime import datetime
-from deepdiff import DeepDiff
-import pyfiglet
+from requests.adapters import HTTPAdapter
 import logging
-import colorlog
 import backoff
 from pathlib import Path
 from typing import Optional, Tuple, Dict, Any
-from tqdm import tqdm
 import time
 import sys
 
+# deepdiff, pyfiglet and colorlog are imported where first needed: they pull
+# in large class hierarchies and font tables at import, which dominates
+# startup on the common no-change run
+
 def setup_logging():
     """Configure logging with color and file output."""
+    import colorlog
+
     # Create logs directory if it doesn't exist
     Path("logs").mkdir(exist_ok=True)
-    
+
     # Create formatters
     file_formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -52,134 +57,353 @@ def setup_logging():
 
 logger = setup_logging()
 
+def _pair_postman_items(x, y, level):
+    """Pair list items by the stable identity keys Postman assigns.
+
+    Matching on id/name lets DeepDiff line items up directly instead of
+    running its pairwise-distance search, which is quadratic in list
+    length. Items without those keys fall back to the default matching.
+    """
+    from deepdiff.helper import CannotCompare
+    if isinstance(x, dict) and isinstance(y, dict):
+        x_key = x.get('id') or x.get('name')
+        y_key = y.get('id') or y.get('name')
+        if x_key is not None and y_key is not None:
+            return x_key == y_key
+    raise CannotCompare()
+
+@functools.lru_cache(maxsize=None)
+def _banner(text: str) -> str:
+    """Render a figlet banner once, importing pyfiglet on first use."""
+    import pyfiglet
+    return pyfiglet.figlet_format(text, font='standard')
+
 class DatabaseManager:
+    # JSONB (pre-parsed binary JSON) arrived in SQLite 3.45; store it when
+    # available so snapshots aren't re-parsed from text on every run
+    _JSONB_SUPPORTED = sqlite3.sqlite_version_info >= (3, 45, 0)
+
+    # Paths whose DDL has already run this process; repeat constructions
+    # skip the CREATE TABLE/INDEX round trip
+    _initialized: set = set()
+
     def __init__(self, db_path: str = "collections.db"):
         """Initialize database connection and create tables if they don't exist."""
         self.db_path = db_path
+        # One long-lived autocommit connection; sqlite3 caches prepared
+        # statements per connection, so the recurring INSERT/SELECT strings
+        # compile once instead of per call
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        # Takes effect at creation for new databases; lets pruning hand
+        # freed pages back without a full VACUUM rewrite
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
         self._init_db()
 
     def _init_db(self) -> None:
-        """Initialize the database schema."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS collections (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp DATETIME NOT NULL,
-                    collection_data JSON NOT NULL
-                )
-            """)
-            conn.commit()
-
-    def save_collection(self, collection_data: Dict[str, Any]) -> int:
-        """Save a collection to the database and return its ID."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(
-                "INSERT INTO collections (timestamp, collection_data) VALUES (?, ?)",
-                (datetime.now().isoformat(), json.dumps(collection_data))
+        """Initialize the database schema (once per process per path)."""
+        if self.db_path in DatabaseManager._initialized:
+            return
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS collections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME NOT NULL,
+                collection_data BLOB NOT NULL,
+                content_sha TEXT
             )
+        """)
+        # Every read orders by timestamp DESC LIMIT n; the index makes
+        # that a B-tree seek instead of a scan-and-sort over the history
+        self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_collections_ts
+            ON collections(timestamp DESC)
+        """)
+        # Small key/value store for fetch state (ETag, Last-Modified)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        DatabaseManager._initialized.add(self.db_path)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Read a value from the meta table, or None when absent."""
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: Optional[str]) -> None:
+        """Store a value in the meta table; None deletes the key."""
+        if value is None:
+            self.conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+        else:
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    def save_collection(self, collection_data: Dict[str, Any]) -> Optional[int]:
+        """Save a collection to the database and return its ID.
+
+        Returns None without storing anything when the content hash matches
+        the newest snapshot, so an unchanged collection costs one hash plus
+        one indexed SELECT instead of a multi-megabyte INSERT.
+        """
+        payload = orjson.dumps(collection_data)
+        content_sha = hashlib.blake2b(payload, digest_size=16).hexdigest()
+        # One explicit transaction covers the hash check and the insert, so
+        # the write path costs a single fsync
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT content_sha FROM collections ORDER BY timestamp DESC LIMIT 1"
+            ).fetchone()
+            if row and row[0] == content_sha:
+                self.conn.execute("COMMIT")
+                return None
+            if self._JSONB_SUPPORTED:
+                # jsonb() wants JSON text; it stores the pre-parsed binary form
+                cursor = self.conn.execute(
+                    "INSERT INTO collections (timestamp, collection_data, content_sha) "
+                    "VALUES (?, jsonb(?), ?)",
+                    (datetime.now().isoformat(), payload.decode(), content_sha)
+                )
+            else:
+                cursor = self.conn.execute(
+                    "INSERT INTO collections (timestamp, collection_data, content_sha) "
+                    "VALUES (?, ?, ?)",
+                    (datetime.now().isoformat(), payload, content_sha)
+                )
+            self.conn.execute("COMMIT")
             return cursor.lastrowid
+        except sqlite3.Error:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def prune_history(self, keep: int = 10) -> int:
+        """Delete all but the newest `keep` snapshots.
+
+        A diff tool only strictly needs the previous snapshot; keeping a
+        short tail for inspection while dropping the rest stops the
+        database growing without bound. Returns the number of rows removed.
+        """
+        cursor = self.conn.execute(
+            """
+            DELETE FROM collections WHERE id NOT IN (
+                SELECT id FROM collections ORDER BY timestamp DESC LIMIT ?
+            )
+            """,
+            (keep,)
+        )
+        if cursor.rowcount:
+            self.conn.execute("PRAGMA incremental_vacuum")
+        return cursor.rowcount
+
+    def latest_snapshots_identical(self) -> bool:
+        """Check whether the two newest snapshots are byte-identical.
+
+        The comparison happens inside SQLite, so the common no-change case
+        never loads either blob into Python. Returns False when fewer than
+        two snapshots exist.
+        """
+        row = self.conn.execute("""
+            SELECT (SELECT collection_data FROM collections
+                    ORDER BY timestamp DESC LIMIT 1)
+                 = (SELECT collection_data FROM collections
+                    ORDER BY timestamp DESC LIMIT 1 OFFSET 1)
+        """).fetchone()
+        return bool(row[0])
 
     def get_latest_collections(self, limit: int = 2) -> list:
         """Retrieve the latest collections ordered by timestamp."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                "SELECT * FROM collections ORDER BY timestamp DESC LIMIT ?",
-                (limit,)
-            )
-            return [
-                {
-                    'id': row['id'],
-                    'timestamp': row['timestamp'],
-                    'collection_data': json.loads(row['collection_data'])
-                }
-                for row in cursor.fetchall()
-            ]
+        if self._JSONB_SUPPORTED:
+            # json() renders JSONB back to text for the Python-side parse
+            query = ("SELECT id, timestamp, json(collection_data) "
+                     "FROM collections ORDER BY timestamp DESC LIMIT ?")
+        else:
+            query = ("SELECT id, timestamp, collection_data "
+                     "FROM collections ORDER BY timestamp DESC LIMIT ?")
+        # Plain tuples for this cursor; the Row wrapper and keyed access buy
+        # nothing when the rows are unpacked immediately
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(query, (limit,))
+        return [
+            {'id': row_id, 'timestamp': timestamp, 'collection_data': orjson.loads(blob)}
+            for row_id, timestamp, blob in cursor.fetchall()
+        ]
 
 class PostmanCollectionChecker:
     def __init__(self, url: str, db_manager: DatabaseManager):
         """Initialize the checker with URL and database manager."""
         self.url = url
         self.db_manager = db_manager
+        # Pooled keep-alive session with compression; retried fetches reuse
+        # the same TCP/TLS connection instead of reconnecting per attempt
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        # Advertise only encodings urllib3 can decode here; brotli would
+        # need the Brotli package installed to be decompressed
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'Accept': 'application/json'
+        })
+        # Validators persisted across runs so a one-shot invocation can
+        # still get a 304 for an unchanged collection
+        self._etag = db_manager.get_meta('etag')
+        self._last_modified = db_manager.get_meta('last_modified')
 
     @backoff.on_exception(
         backoff.expo,
         requests.exceptions.RequestException,
         max_tries=5
     )
-    def fetch_collection(self) -> Optional[Dict[str, Any]]:
-        """Fetch JSON from URL with exponential backoff retry."""
+    def fetch_collection(self) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Fetch JSON from URL with exponential backoff retry.
+
+        Returns:
+            Tuple[Optional[Dict[str, Any]], bool]: (data, unchanged) —
+                data is None on failure and on a 304; unchanged is True
+                only when the server answered 304 Not Modified
+        """
         try:
-            with tqdm(total=1, desc="Collecting", unit="request", colour="green") as pbar:
-                response = requests.get(self.url)
-                response.raise_for_status()
-                pbar.update(1)
-                logger.info("Collection successfully fetched from API")
-                return response.json()
+            headers = {}
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+            response = self.session.get(self.url, headers=headers or None, timeout=(5, 30))
+            if response.status_code == 304:
+                logger.info("Collection unchanged on server (304); body skipped")
+                return None, True
+            response.raise_for_status()
+            self._etag = response.headers.get('ETag')
+            self._last_modified = response.headers.get('Last-Modified')
+            self.db_manager.set_meta('etag', self._etag)
+            self.db_manager.set_meta('last_modified', self._last_modified)
+            logger.info("Collection successfully fetched from API")
+            # Parse the raw bytes directly; response.json() would decode
+            # to str first and then walk it with stdlib json
+            return orjson.loads(response.content), False
         except requests.RequestException as e:
             logger.error(f"Failed to fetch collection after retries: {e}")
-            return None
+            return None, False
 
     def compare_collections(self) -> None:
         """Fetch new collection, save to DB, and compare with previous version."""
-        current_data = self.fetch_collection()
+        current_data, unchanged = self.fetch_collection()
+        if unchanged:
+            # A 304 is the steady-state success case: render the all-clear
+            # result instead of bailing out like a failed fetch
+            self._display_results({})
+            return
         if not current_data:
             return
 
-        with tqdm(total=3, desc="Processing", unit="step", colour="blue") as pbar:
-            # Save new collection
-            collection_id = self.db_manager.save_collection(current_data)
-            logger.info(f"New collection saved to database with ID: {collection_id}")
-            pbar.update(1)
-            
-            # Get latest collections for comparison
-            latest_collections = self.db_manager.get_latest_collections(2)
-            pbar.update(1)
-            
-            if len(latest_collections) < 2:
-                logger.info("No previous collection found for comparison")
-                pbar.update(1)
-                return
-
-            # Compare current with previous
-            diff = DeepDiff(
-                latest_collections[1]['collection_data'],
-                latest_collections[0]['collection_data'],
-                ignore_order=True
-            )
-            pbar.update(1)
-            
-            self._display_results(diff)
+        # Save new collection; None means the content hash matched the
+        # newest snapshot, so both the INSERT and the diff are skipped
+        collection_id = self.db_manager.save_collection(current_data)
+        if collection_id is None:
+            logger.info("Collection unchanged (content hash match); snapshot not stored")
+            self._display_results({})
+            return
+        logger.info(f"New collection saved to database with ID: {collection_id}")
+        pruned = self.db_manager.prune_history()
+        if pruned:
+            logger.info(f"Pruned {pruned} old snapshot(s) from history")
+
+        # Fast path: when the two newest snapshots are byte-identical,
+        # SQLite answers in C and the DeepDiff traversal is skipped
+        if self.db_manager.latest_snapshots_identical():
+            self._display_results({})
+            return
+
+        # Get latest collections for comparison
+        latest_collections = self.db_manager.get_latest_collections(2)
+
+        if len(latest_collections) < 2:
+            logger.info("No previous collection found for comparison")
+            return
+
+        # Compare current with previous
+        diff = self._hashed_diff(
+            latest_collections[1]['collection_data'],
+            latest_collections[0]['collection_data']
+        )
+
+        self._display_results(diff)
+
+    def _hashed_diff(self, previous: Dict[str, Any], current: Dict[str, Any]) -> 'DeepDiff':
+        """Diff two collections, pruning subtrees that serialize identically.
 
-    def _display_results(self, diff: DeepDiff) -> None:
+        DeepDiff with ignore_order walks every node of both trees; between
+        successive snapshots most top-level subtrees are unchanged, so
+        comparing their serialized bytes first and only handing the
+        differing ones to DeepDiff cuts the traversal to the changed
+        branches. A reordered-but-equal subtree serializes differently and
+        falls through to DeepDiff, which still reports it as unchanged.
+        """
+        from deepdiff import DeepDiff
+
+        if not (isinstance(previous, dict) and isinstance(current, dict)):
+            changed_previous, changed_current = previous, current
+        else:
+            changed_keys = [
+                key for key in previous.keys() | current.keys()
+                if key not in previous or key not in current
+                or orjson.dumps(previous[key]) != orjson.dumps(current[key])
+            ]
+            changed_previous = {key: previous[key] for key in changed_keys if key in previous}
+            changed_current = {key: current[key] for key in changed_keys if key in current}
+
+        # cache_size enables DeepDiff's internal memoization; the cutoffs
+        # stop it from hunting for distant pairings when items are clearly
+        # different, and the compare func keys the list matching on stable
+        # Postman identifiers
+        return DeepDiff(
+            changed_previous,
+            changed_current,
+            ignore_order=True,
+            cache_size=5000,
+            cache_tuning_sample_size=500,
+            cutoff_distance_for_pairs=0.3,
+            cutoff_intersection_for_pairs=0.7,
+            iterable_compare_func=_pair_postman_items
+        )
+
+    def _display_results(self, diff: Dict[str, Any]) -> None:
         """Display comparison results with ASCII art."""
         if diff:
             # Log the comparison status to file
             logger.info("Status: Changes detected in collection")
-            
-            # Clear the line and display ASCII art
-            sys.stdout.write("\033[K")  # Clear the line
-            changes_text = pyfiglet.figlet_format("CHANGES DETECTED", font='standard')
-            print("\n" + changes_text)
+
+            # Display ASCII art
+            print("\n" + _banner("CHANGES DETECTED"))
             
             # Log detailed changes to file only
             logger.info("Changes found:")
             for change_type, changes in diff.items():
                 logger.info(f"\n{change_type}:")
-                logger.info(json.dumps(changes, indent=2))
+                logger.info(orjson.dumps(
+                    changes, option=orjson.OPT_INDENT_2, default=str).decode())
         else:
             # Log the comparison status to file
             logger.info("Status: No changes detected in collection")
             
-            # Clear the line and display ASCII art
-            sys.stdout.write("\033[K")  # Clear the line
-            clear_text = pyfiglet.figlet_format("ALL CLEAR", font='standard')
-            print("\n" + clear_text)
-
-def init_db(db_path: str = "collections.db") -> None:
-    """Initialize the database with schema."""
-    DatabaseManager(db_path)
+            # Display ASCII art
+            print("\n" + _banner("ALL CLEAR"))
+
+def init_db(db_path: str = "collections.db") -> DatabaseManager:
+    """Initialize the database with schema and return the manager."""
+    db_manager = DatabaseManager(db_path)
     logger.info(f"Database initialized at {db_path}")
+    return db_manager
 
 def main():
     """Main execution function."""